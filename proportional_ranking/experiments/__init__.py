@@ -1,2 +1,3 @@
 from proportional_ranking.experiments.compare import *
 from proportional_ranking.experiments.data_generation import *
+from proportional_ranking.experiments.records import *
@@ -1,34 +1,169 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 import numpy as np
-from proportional_ranking.experiments.data_generation import generate_profile
+from proportional_ranking.experiments.data_generation import generate_profiles
+from proportional_ranking.experiments.records import ResultSink
+from proportional_ranking.utils.profiles import profile_hash
+
+
+def _child_seed(seed, i):
+    """
+    The i-th child of a seed sequence, as given by ``seed.spawn`` on a fresh sequence, but
+    without changing ``seed``.
+    """
+    return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (i,),
+                                  pool_size=seed.pool_size)
 
 
-def compare_rules(n, m, rules, iterations=100, verbose=False):
+def _compare_chunk(n, m, rules, iterations, seed, keep_records=False, estimate_budget=None,
+                   escalation_margin=0.1):
+    """
+    Run ``iterations`` elections of :func:`compare_rules` with the random generator given by
+    ``seed``, and return the sums of the qualities and of the successes, and the records of
+    the elections if ``keep_records`` is True.
+    """
     n_rules = len(rules)
     avg = np.zeros(n_rules + 1)
     success = np.zeros(n_rules + 1)
-    i = 0
-    while i < iterations:
-        profile = generate_profile(n, m, proba=np.random.rand())
-        if np.min(profile.sum(axis=0)) == 0 or np.min(profile.sum(axis=1)) == 0:
-            continue
-
-        if verbose and i % 50 == 0:
-            print(i)
-
+    records = []
+    if estimate_budget is not None:
+        # the profiles are drawn from ``seed`` itself, as without estimates
+        rng = np.random.default_rng(_child_seed(seed, 0))
+    for profile in generate_profiles(iterations, n, m, seed=seed):
         success_i = []
         qualities = []
         ranking = []
+        key = profile_hash(profile) if keep_records else None
         for rule in rules:
             rule.set_profile(profile)
             ranking.append(rule.ranking())
-            success_i.append(rule.justifiable)
-            qualities.append(rule.quality)
+            estimate = np.inf
+            if estimate_budget is not None:
+                estimate = rule.quality_estimate(estimate_budget, rng)[0]
+            if estimate < 1 - escalation_margin:
+                # the estimate is an upper bound, so the ranking is not justifiable
+                qualities.append(estimate)
+                success_i.append(False)
+            else:
+                qualities.append(rule.quality)
+                success_i.append(rule.justifiable)
+            if keep_records:
+                records.append((key, rule.name, ranking[-1], qualities[-1], success_i[-1]))
 
         success_i.append(np.max(success_i))
         qualities.append(np.max(qualities))
         success += success_i
         avg += qualities
-        i += 1
+
+    return avg, success, records
+
+
+def compare_rules(n, m, rules, iterations=100, verbose=False, n_jobs=1, chunk_size=100, seed=None,
+                  sink=None, estimate_budget=None, escalation_margin=0.1):
+    """
+    Compare the quality of rules on random profiles of n voters and m candidates.
+
+    The iterations are split into chunks of ``chunk_size`` elections. Each chunk has its own
+    random generator, spawned from ``seed``, so the results only depend on ``seed`` and
+    ``chunk_size``, and not on the number of workers. The chunks are run by a pool of
+    ``n_jobs`` processes, and their sums are reduced in the order of the chunks.
+
+    If a ``sink`` is given, the record of every election and every rule is written to it
+    (see :class:`~proportional_ranking.experiments.records.ResultSink`), chunk by chunk.
+
+    For large electorates, an ``estimate_budget`` can be given. The quality of each ranking
+    is then first estimated from a search of cohesive groups (see
+    :func:`~proportional_ranking.utils.quality.quality_estimate`), and the exact quality is
+    only computed if the estimate is at least ``1 - escalation_margin``. Otherwise, the
+    estimate is kept as the quality and the ranking is not justifiable, since the estimate is
+    an upper bound of the quality. The averages of the qualities are then upper bounds.
+
+    Parameters
+    ----------
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    rules : ProportionalRanking list
+        The rules to compare
+    iterations : int
+        The number of profiles
+    verbose : bool
+        If True, print the progress after every chunk
+    n_jobs : int
+        The number of worker processes. If 1, the chunks are run in the current process.
+        If -1, one process per CPU is used.
+    chunk_size : int
+        The number of profiles of each chunk
+    seed : int or np.random.SeedSequence
+        The seed of the experiment. If None, fresh entropy is used. A seed sequence is not
+        changed, so it can be given again to reproduce the experiment.
+    sink : ResultSink or str
+        Where to write the records of the elections. If it is a directory, a sink is opened in
+        it and closed at the end.
+    estimate_budget : int
+        The budget of the quality estimates. If None, the exact quality is always computed.
+    escalation_margin : float
+        The margin below 1 of the estimates for which the exact quality is computed
+
+    Returns
+    -------
+    np.ndarray
+        The average quality of each rule, and of the best rule for each profile
+    np.ndarray
+        The proportion of profiles for which each rule is justified, and for which at least
+        one rule is justified
+
+    Examples
+    --------
+    >>> from proportional_ranking.rules import AV, SeqPAV
+    >>> avg, success = compare_rules(6, 4, [AV(), SeqPAV()], iterations=20, chunk_size=8, seed=1)
+    >>> avg.shape, success.shape
+    ((3,), (3,))
+    >>> np.array_equal(avg, compare_rules(6, 4, [AV(), SeqPAV()], 20, chunk_size=8, seed=1)[0])
+    True
+    >>> estimated = compare_rules(6, 4, [AV(), SeqPAV()], 20, chunk_size=8, seed=1,
+    ...                           estimate_budget=16)
+    >>> np.array_equal(success, estimated[1])
+    True
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    sizes = [chunk_size] * (iterations // chunk_size)
+    if iterations % chunk_size:
+        sizes.append(iterations % chunk_size)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = [_child_seed(seed, i) for i in range(len(sizes))]
+
+    n_rules = len(rules)
+    avg = np.zeros(n_rules + 1)
+    success = np.zeros(n_rules + 1)
+    done = 0
+    own_sink = isinstance(sink, str)
+    if own_sink:
+        sink = ResultSink(sink)
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs != 1 else None
+    try:
+        run = map if executor is None else executor.map
+        results = run(_compare_chunk, repeat(n), repeat(m), repeat(rules), sizes, seeds,
+                      repeat(sink is not None), repeat(estimate_budget),
+                      repeat(escalation_margin))
+        for size, (avg_chunk, success_chunk, records) in zip(sizes, results):
+            avg += avg_chunk
+            success += success_chunk
+            for record in records:
+                sink.add(*record)
+            done += size
+            if verbose:
+                print(done)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if own_sink:
+            sink.close()
 
     return avg / iterations, success / iterations
 
@@ -1,5 +1,322 @@
 import numpy as np
 
 
-def generate_profile(n, m, proba=0.5):
-    return np.random.rand(n, m) > proba
+def generate_profile(n, m, proba=0.5, rng=None):
+    """
+    Generate a random profile in which each voter approves each candidate independently.
+
+    Parameters
+    ----------
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    proba : float
+        The probability that a voter does not approve a candidate
+    rng : np.random.Generator
+        The random generator. If None, the global state of ``np.random`` is used.
+
+    Returns
+    -------
+    np.ndarray
+        The approval profile
+
+    Examples
+    --------
+    >>> generate_profile(2, 3, rng=np.random.default_rng(0)).astype(int)
+    array([[1, 0, 0],
+           [0, 1, 1]])
+    """
+    if rng is None:
+        return np.random.rand(n, m) > proba
+    return rng.random((n, m)) > proba
+
+
+def impartial_culture(size, n, m, p=None, rng=None):
+    """
+    Generate profiles in which each voter approves each candidate independently with
+    probability p.
+
+    Parameters
+    ----------
+    size : int
+        The number of profiles
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    p : float or np.ndarray
+        The probability of approval. It can be given per voter, as an array of n values, or
+        per profile and per voter, as an array of shape (size, n). If None, each profile has
+        its own probability, drawn uniformly in [0, 1].
+    rng : np.random.Generator
+        The random generator
+
+    Returns
+    -------
+    np.ndarray
+        A boolean tensor of shape (size, n, m)
+
+    Examples
+    --------
+    >>> impartial_culture(2, 3, 4, p=[1, 0, 1], rng=np.random.default_rng(0)).astype(int)
+    array([[[1, 1, 1, 1],
+            [0, 0, 0, 0],
+            [1, 1, 1, 1]],
+    <BLANKLINE>
+           [[1, 1, 1, 1],
+            [0, 0, 0, 0],
+            [1, 1, 1, 1]]])
+    """
+    rng = np.random.default_rng(rng)
+    if p is None:
+        p = rng.random((size, 1))
+    p = np.broadcast_to(np.asarray(p, dtype=float), (size, n))
+    return rng.random((size, n, m)) < p[:, :, None]
+
+
+def resampling(size, n, m, p=0.5, phi=0.5, rng=None):
+    """
+    Generate profiles with the resampling model. Each profile has a central ballot with
+    ``round(p * m)`` candidates. For each candidate, a voter copies the central ballot with
+    probability ``1 - phi``, and otherwise approves the candidate with probability p.
+
+    Parameters
+    ----------
+    size : int
+        The number of profiles
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    p : float
+        The proportion of approved candidates
+    phi : float
+        The resampling probability. If 0, every voter casts the central ballot.
+    rng : np.random.Generator
+        The random generator
+
+    Returns
+    -------
+    np.ndarray
+        A boolean tensor of shape (size, n, m)
+
+    Examples
+    --------
+    >>> profiles = resampling(3, 4, 5, p=0.4, phi=0, rng=np.random.default_rng(0))
+    >>> profiles.sum(axis=2)
+    array([[2, 2, 2, 2],
+           [2, 2, 2, 2],
+           [2, 2, 2, 2]])
+    """
+    rng = np.random.default_rng(rng)
+    k = int(round(p * m))
+    central = np.argsort(rng.random((size, m)), axis=1) < k
+    resample = rng.random((size, n, m)) < phi
+    return np.where(resample, rng.random((size, n, m)) < p, central[:, None, :])
+
+
+def euclidean(size, n, m, radius=0.2, dim=1, rng=None):
+    """
+    Generate profiles with the Euclidean model. Voters and candidates are points drawn
+    uniformly in ``[0, 1]^dim``, and a voter approves the candidates at distance at most
+    ``radius``. With ``dim=1``, this is the interval model.
+
+    Parameters
+    ----------
+    size : int
+        The number of profiles
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    radius : float
+        The approval radius of voters
+    dim : int
+        The dimension of the space
+    rng : np.random.Generator
+        The random generator
+
+    Returns
+    -------
+    np.ndarray
+        A boolean tensor of shape (size, n, m)
+
+    Examples
+    --------
+    >>> euclidean(2, 3, 4, radius=2, rng=np.random.default_rng(0)).all()
+    True
+    """
+    rng = np.random.default_rng(rng)
+    voters = rng.random((size, n, 1, dim))
+    candidates = rng.random((size, 1, m, dim))
+    return np.sqrt(((voters - candidates) ** 2).sum(axis=3)) <= radius
+
+
+def disjoint_groups(size, n, m, groups=2, p=1.0, rng=None):
+    """
+    Generate profiles with the party-list model. Candidates are split into ``groups``
+    parties of consecutive candidates with almost equal sizes, each voter supports a party
+    drawn uniformly, and approves each candidate of its party with probability p.
+
+    Parameters
+    ----------
+    size : int
+        The number of profiles
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    groups : int
+        The number of parties
+    p : float
+        The probability that a voter approves a candidate of its party
+    rng : np.random.Generator
+        The random generator
+
+    Returns
+    -------
+    np.ndarray
+        A boolean tensor of shape (size, n, m)
+
+    Examples
+    --------
+    >>> profile = disjoint_groups(1, 4, 6, groups=3, rng=np.random.default_rng(1))[0]
+    >>> profile.astype(int)
+    array([[0, 0, 1, 1, 0, 0],
+           [0, 0, 1, 1, 0, 0],
+           [0, 0, 0, 0, 1, 1],
+           [0, 0, 0, 0, 1, 1]])
+    """
+    rng = np.random.default_rng(rng)
+    party = np.arange(m) * groups // m
+    support = rng.integers(groups, size=(size, n))
+    return (support[:, :, None] == party) & (rng.random((size, n, m)) < p)
+
+
+cultures = {
+    'impartial': impartial_culture,
+    'resampling': resampling,
+    'euclidean': euclidean,
+    'disjoint': disjoint_groups,
+}
+
+
+def _valid_profiles(profiles):
+    """
+    Mask of the profiles in which every voter approves a candidate and every candidate is
+    approved by a voter.
+    """
+    return profiles.any(axis=2).all(axis=1) & profiles.any(axis=1).all(axis=1)
+
+
+def generate_profiles(size, n, m, culture='impartial', seed=None, valid=True,
+                      max_tries=1000, **params):
+    """
+    Generate a batch of profiles from a culture model.
+
+    If ``valid`` is True, the profiles with an empty ballot or a candidate without supporter
+    are rejected, and only these profiles are drawn again, by batches.
+
+    Parameters
+    ----------
+    size : int
+        The number of profiles
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    culture : str or callable
+        The culture model, either a key of ``cultures`` or a function with the same
+        signature as :func:`impartial_culture`
+    seed : int, np.random.SeedSequence or np.random.Generator
+        The seed of the random generator
+    valid : bool
+        If True, only valid profiles are returned
+    max_tries : int
+        The maximal number of batches drawn to replace rejected profiles
+    **params
+        The parameters of the culture model
+
+    Returns
+    -------
+    np.ndarray
+        A boolean tensor of shape (size, n, m)
+
+    Examples
+    --------
+    >>> profiles = generate_profiles(100, 5, 4, seed=0)
+    >>> profiles.shape
+    (100, 5, 4)
+    >>> bool(profiles.any(axis=2).all() and profiles.any(axis=1).all())
+    True
+    >>> np.array_equal(profiles, generate_profiles(100, 5, 4, seed=0))
+    True
+    """
+    rng = np.random.default_rng(seed)
+    model = cultures[culture] if isinstance(culture, str) else culture
+    profiles = model(size, n, m, rng=rng, **params)
+    if not valid:
+        return profiles
+    missing = np.flatnonzero(~_valid_profiles(profiles))
+    drawn, accepted = size, size - len(missing)
+    # the batches of new profiles are at most of about 2^22 approvals
+    max_batch = max(1, 2 ** 22 // max(1, n * m))
+    tries = 0
+    while len(missing) > 0:
+        tries += 1
+        if tries > max_tries:
+            raise ValueError("Could not generate valid profiles with culture %s" % culture)
+        # enough profiles to replace the rejected ones, given the acceptance rate so far
+        rate = accepted / drawn if accepted > 0 else 1 / (2 * drawn)
+        batch = model(min(int(np.ceil(len(missing) / rate)), max_batch), n, m, rng=rng, **params)
+        ok = _valid_profiles(batch)
+        drawn += len(batch)
+        accepted += ok.sum()
+        batch = batch[ok][:len(missing)]
+        profiles[missing[:len(batch)]] = batch
+        missing = missing[len(batch):]
+    return profiles
+
+
+def profile_stream(count, n, m, culture='impartial', seed=None, batch_size=256, **params):
+    """
+    Iterate over random valid profiles from a culture model. The profiles are generated by
+    batches of ``batch_size`` with :func:`generate_profiles`, so that only one batch is in
+    memory at a time. For a given seed, the profiles depend on ``batch_size``.
+
+    Parameters
+    ----------
+    count : int
+        The number of profiles. If None, the iterator never stops.
+    n : int
+        The number of voters
+    m : int
+        The number of candidates
+    culture : str or callable
+        The culture model (see :func:`generate_profiles`)
+    seed : int, np.random.SeedSequence or np.random.Generator
+        The seed of the random generator
+    batch_size : int
+        The number of profiles generated at once
+    **params
+        The parameters of the culture model
+
+    Yields
+    ------
+    np.ndarray
+        A valid approval profile
+
+    Examples
+    --------
+    >>> profiles = list(profile_stream(5, 3, 3, culture='euclidean', seed=0, radius=0.3))
+    >>> len(profiles), profiles[0].shape
+    (5, (3, 3))
+    """
+    rng = np.random.default_rng(seed)
+    done = 0
+    while count is None or done < count:
+        size = batch_size if count is None else min(batch_size, count - done)
+        for profile in generate_profiles(size, n, m, culture, rng, **params):
+            yield profile
+        done += size
@@ -0,0 +1,161 @@
+import os
+import re
+
+import numpy as np
+
+
+class ResultSink:
+    """
+    Append-only store of per-election records, written to disk in chunks.
+
+    Records are kept in a buffer of at most ``buffer_size`` records. When the buffer is full,
+    it is written as a new NPZ file ``records-XXXXXX.npz`` in ``directory``, with one array
+    per column. Files are never rewritten, so a sink can be reopened to append the records of
+    a new run. The records are read back with :func:`load_records`.
+
+    The columns are:
+
+    * ``profile``: the hash of the profile (see
+      :func:`~proportional_ranking.utils.profiles.profile_hash`)
+    * ``rule``: the name of the rule
+    * ``ranking``: the ranking, padded with -1 (only -1 if the rule returned no ranking)
+    * ``quality``: the quality of the ranking
+    * ``justifiable``: True if the ranking satisfies justified demand
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the chunk files. It is created if needed.
+    buffer_size : int
+        The maximal number of records kept in memory
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> with ResultSink(directory, buffer_size=2) as sink:
+    ...     sink.add("a1", "AV", [1, 0, 2], 0.5, False)
+    ...     sink.add("a1", "seqPAV", [0, 1], 1.0, True)
+    ...     sink.add("b2", "AV", None, 0.0, False)
+    >>> sorted(os.listdir(directory))
+    ['records-000000.npz', 'records-000001.npz']
+    >>> records = load_records(directory)
+    >>> records['rule']
+    array(['AV', 'seqPAV', 'AV'], dtype='<U6')
+    >>> records['ranking']
+    array([[ 1,  0,  2],
+           [ 0,  1, -1],
+           [-1, -1, -1]])
+    """
+
+    _pattern = re.compile(r"records-(\d+)\.npz$")
+
+    def __init__(self, directory, buffer_size=10000):
+        self.directory = directory
+        self.buffer_size = buffer_size
+        os.makedirs(directory, exist_ok=True)
+        indices = [int(match.group(1)) for match in map(self._pattern.match, os.listdir(directory))
+                   if match]
+        self.next_chunk = max(indices) + 1 if indices else 0
+        self._buffer = []
+
+    def add(self, profile, rule, ranking, quality, justifiable):
+        """
+        Add a record to the buffer, and write the buffer if it is full.
+
+        Parameters
+        ----------
+        profile : str
+            The hash of the profile
+        rule : str
+            The name of the rule
+        ranking : int list
+            The ranking, or None
+        quality : float
+            The quality of the ranking
+        justifiable : bool
+            True if the ranking satisfies justified demand
+
+        Returns
+        -------
+        None
+
+        """
+        ranking = [] if ranking is None else [int(c) for c in ranking]
+        self._buffer.append((profile, rule, ranking, float(quality), bool(justifiable)))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the records of the buffer in a new chunk file, and empty the buffer.
+
+        Returns
+        -------
+        None
+
+        """
+        if not self._buffer:
+            return
+        profiles, rules, rankings, qualities, justifiable = zip(*self._buffer)
+        width = max(len(ranking) for ranking in rankings)
+        padded = np.full((len(rankings), width), -1, dtype=int)
+        for i, ranking in enumerate(rankings):
+            padded[i, :len(ranking)] = ranking
+
+        path = os.path.join(self.directory, "records-%06d.npz" % self.next_chunk)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(file, profile=np.array(profiles), rule=np.array(rules), ranking=padded,
+                     quality=np.array(qualities), justifiable=np.array(justifiable))
+        os.replace(tmp_path, path)
+        self.next_chunk += 1
+        self._buffer = []
+
+    def close(self):
+        """
+        Write the remaining records.
+
+        Returns
+        -------
+        None
+
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_records(directory):
+    """
+    Read all the records written by a :class:`ResultSink` in a directory.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the chunk files
+
+    Returns
+    -------
+    dict
+        The columns of the records, concatenated in the order of the chunks. Rankings of
+        different lengths are padded with -1.
+
+    """
+    chunks = sorted((int(match.group(1)), match.group(0))
+                    for match in map(ResultSink._pattern.match, os.listdir(directory)) if match)
+    columns = {}
+    for _, name in chunks:
+        with np.load(os.path.join(directory, name)) as chunk:
+            for key in chunk.files:
+                columns.setdefault(key, []).append(chunk[key])
+    if not columns:
+        return {}
+    width = max(ranking.shape[1] for ranking in columns['ranking'])
+    columns['ranking'] = [np.pad(ranking, ((0, 0), (0, width - ranking.shape[1])),
+                                 constant_values=-1) for ranking in columns['ranking']]
+    return {key: np.concatenate(values) for key, values in columns.items()}
@@ -1,4 +1,5 @@
 from proportional_ranking.rules.general import ProportionalRanking
+from proportional_ranking.utils.profiles import approval_scores
 import numpy as np
 import math
 
@@ -28,7 +29,7 @@ class AV(ProportionalRanking):
         super().__init__("Approval voting")
 
     def ranking(self):
-        return np.argsort(-self.profile.sum(axis=0))
+        return np.argsort(-approval_scores(self.profile))
 
     def representation(self, alpha, lambd):
         if alpha <= 0.5:
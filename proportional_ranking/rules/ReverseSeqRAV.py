@@ -1,4 +1,8 @@
 from proportional_ranking.rules.general import ProportionalRanking
+from proportional_ranking.rules.SeqRAV import _pad_weights
+from proportional_ranking.utils.profiles import (as_float, is_sparse, weighted_ballots, weighted_scores,
+                                                 supporters, ballot_sizes)
+from proportional_ranking.utils.selection import last_argmin
 import numpy as np
 
 
@@ -37,40 +41,105 @@ class ReverseSeqRAV(ProportionalRanking):
     <proportional_ranking.rules.ReverseSeqRAV.ReverseSeqRAV object at ...>
     >>> election.print_ranking()
     c > a > d > b > e
+    >>> election.rank_batch([[[1, 1, 0], [0, 1, 1]], [[1, 0, 1], [0, 1, 1]]])
+    array([[1, 0, 2],
+           [2, 0, 1]])
     """
 
     def __init__(self, weights_vector, name="reverseSeqRAV"):
         super().__init__(name)
         self.weights_vector = weights_vector
 
-    def ranking(self):
-        n, m = self.profile.shape
+    def _get_weights_vector(self, m):
+        """
+        The vector of weights for elections with m candidates.
+        """
+        return self.weights_vector
 
-        scores = self.profile.copy()
-        weights = scores.sum(axis=1)
-        ranking = []
-        weights_vector = [0] + self.weights_vector
+    # relative difference under which two scores are a tie, broken in favor of the highest index
+    tolerance = 1e-9
 
+    def ranking(self):
+        ballots, counts = weighted_ballots(self.profile)
+        profile = as_float(ballots)
+        n_ballots, m = profile.shape
+        sparse_profile = is_sparse(profile)
+        # rows of the profile, to get the ballots of the supporters of a candidate
+        rows = profile.tocsr() if sparse_profile else profile
+
+        remaining = np.ones(m, dtype=bool)
+        # weights[b] is the number of candidates approved by voters of ballot b not yet ranked
+        weights = ballot_sizes(ballots)
+        ranking = []
+        # a voter with w candidates not yet ranked has a weight of weights_vector[w - 1]
+        weights_vector = _pad_weights(np.concatenate(([0], self.weights_vector)), m)
+        # increase of the weight of a voter when one of its candidates is ranked
+        increases = np.append(weights_vector[:-1] - weights_vector[1:], 0)
+
+        # the scores are kept from one step to the next, and only the increase of the weights
+        # of the supporters of the ranked candidate is added
+        scores = weighted_scores(counts * weights_vector[weights], profile)
         for _ in range(m):
-            curr_weights = np.array([weights_vector[x] for x in weights])
-            s = np.argsort(curr_weights.dot(scores)[::-1])
-            s = len(s) - 1 - s
-            worst_candidate = -1
-            for candidate in s:
-                if candidate not in ranking:
-                    worst_candidate = candidate
-                    break
-
+            scores[~remaining] = np.inf
+            # among the candidates with the lowest score, the last one is picked
+            worst_candidate = last_argmin(scores, self.tolerance)
             ranking.append(worst_candidate)
 
-            for k in range(n):
-                if scores[k, worst_candidate]:
-                    weights[k] -= 1
-
-            scores[:, worst_candidate] = False
+            voters = supporters(profile, worst_candidate)
+            increase = counts[voters] * increases[weights[voters] - 1]
+            if sparse_profile or 4 * len(voters) < n_ballots:
+                scores = scores + weighted_scores(increase, rows[voters])
+            else:
+                # copying the rows of many supporters is slower than a product with the whole
+                # profile
+                full_increase = np.zeros(n_ballots)
+                full_increase[voters] = increase
+                scores = scores + weighted_scores(full_increase, profile)
+            weights[voters] -= 1
+            remaining[worst_candidate] = False
 
         return ranking[::-1]
 
+    def rank_batch(self, profiles):
+        """
+        Compute the rankings of several elections with the same number of voters and
+        candidates at once. The greedy steps of all elections are done together, with one
+        batched matrix product per step. The profile of the rule is not changed.
+
+        Parameters
+        ----------
+        profiles: np.ndarray
+            A boolean tensor of shape (B, n, m). ``profiles[b]`` is the profile of election b.
+
+        Returns
+        -------
+        np.ndarray
+            A (B, m) array. ``rankings[b]`` is the ranking of election b.
+
+        """
+        approvals = np.asarray(profiles, dtype=bool)
+        n_elections, n, m = approvals.shape
+        profiles = approvals.astype(float)
+        elections = np.arange(n_elections)
+
+        remaining = np.ones((n_elections, m), dtype=bool)
+        weights = approvals.sum(axis=2)
+        weights_vector = _pad_weights(np.concatenate(([0], self._get_weights_vector(m))), m)
+        increases = np.append(weights_vector[:-1] - weights_vector[1:], 0)
+        scores = np.matmul(weights_vector[weights][:, None, :], profiles)[:, 0, :]
+        rankings = np.zeros((n_elections, m), dtype=int)
+        for t in range(m - 1, -1, -1):
+            scores[~remaining] = np.inf
+            worst_candidates = last_argmin(scores, self.tolerance)
+            rankings[:, t] = worst_candidates
+            satisfied = approvals[elections, :, worst_candidates]
+            increase = satisfied * increases[np.maximum(weights - 1, 0)]
+            scores = scores + np.matmul(increase[:, None, :], profiles)[:, 0, :]
+            weights -= satisfied
+            remaining[elections, worst_candidates] = False
+
+        return rankings
+
 
 class ReverseSeqPAV(ReverseSeqRAV):
     """
@@ -119,9 +188,11 @@ class ReverseSeqPAV(ReverseSeqRAV):
         super().__init__(None, name)
         self.alpha = alpha
 
+    def _get_weights_vector(self, m):
+        return np.array([1/(i + self.alpha) for i in range(1, m+1)])
+
     def set_profile(self, profile):
-        self.profile = np.array(profile)
-        self.delete_cache()
+        super().set_profile(profile)
         _, m = self.profile.shape
-        self.weights_vector = np.array([1/(i + self.alpha) for i in range(1, m+1)])
+        self.weights_vector = self._get_weights_vector(m)
         return self
@@ -1,8 +1,20 @@
 from proportional_ranking.rules.general import ProportionalRanking
+from proportional_ranking.utils.profiles import (as_float, is_sparse, weighted_ballots, weighted_scores,
+                                                 supporters)
+from proportional_ranking.utils.selection import first_argmax
 import numpy as np
 import math
 
 
+def _pad_weights(weights_vector, m):
+    """
+    The weights vector followed by weights of 0, up to the weight of voters approving the m
+    candidates.
+    """
+    weights_vector = np.asarray(weights_vector, dtype=float)
+    return np.concatenate((weights_vector, np.zeros(max(1, m + 1 - len(weights_vector)))))
+
+
 class SeqRAV(ProportionalRanking):
     """
     SeqRAV Voting Rule:
@@ -10,6 +22,9 @@ class SeqRAV(ProportionalRanking):
     RAV stands for reweighted approval voting. Every time we pick a new candidate, the weight of
     satsified voters decrease.
 
+    Ties between candidates whose scores only differ by rounding errors are broken in favor of
+    the candidate with the lowest index.
+
     Parameters
     ----------
     name: str
@@ -37,29 +52,162 @@ class SeqRAV(ProportionalRanking):
     <proportional_ranking.rules.SeqRAV.SeqRAV object at ...>
     >>> election.print_ranking()
     c > a > d > b > e
+    >>> election.rank_batch([[[1, 1, 0], [0, 1, 1]], [[1, 0, 1], [0, 1, 1]]])
+    array([[1, 0, 2],
+           [2, 0, 1]])
     """
 
     def __init__(self, weights_vector, name="seqRAV"):
         super().__init__(name)
         self.weights_vector = weights_vector
 
+    def _get_weights_vector(self, m):
+        """
+        The vector of weights for elections with m candidates.
+        """
+        return self.weights_vector
+
+    # relative difference under which two scores are a tie, broken in favor of the lowest index
+    tolerance = 1e-9
+
+    def set_profile(self, profile):
+        super().set_profile(profile)
+        # scores of the candidates at each step of the last ranking, used to update it
+        self._steps = None
+        return self
+
     def ranking(self):
-        n, m = self.profile.shape
-
-        scores = self.profile.copy()
-        weights = np.zeros(n, dtype=int)
-        ranking = []
-        for _ in range(m):
-            curr_weights = np.array([self.weights_vector[w] for w in weights])
-            best_candidate = np.argmax(curr_weights.dot(scores))
+        ballots, counts = weighted_ballots(self.profile)
+        return self._greedy(ballots, counts, [], [])
+
+    def _greedy(self, ballots, counts, ranking, steps):
+        """
+        Run the greedy loop of the rule, starting after the candidates of ``ranking``, and
+        keep the scores of every step. ``steps`` are the scores of the steps of ``ranking``.
+
+        The scores are kept from one step to the next: when a candidate is added, only the
+        decrease of the weights of its supporters is subtracted. The rounding errors of these
+        updates are absorbed by the tolerance of the choice of the best candidate.
+        """
+        profile = as_float(ballots)
+        n_ballots, m = profile.shape
+        sparse_profile = is_sparse(profile)
+        # rows of the profile, to get the ballots of the supporters of a candidate
+        rows = profile.tocsr() if sparse_profile else profile
+
+        weights_vector = _pad_weights(self.weights_vector, m)
+        # decrease of the weight of a voter when one of its candidates is added to the ranking
+        decreases = np.append(weights_vector[:-1] - weights_vector[1:], 0)
+        remaining = np.ones(m, dtype=bool)
+        # weights[b] is the number of candidates approved by voters of ballot b in the ranking
+        weights = np.zeros(n_ballots, dtype=int)
+        for candidate in ranking:
+            if remaining[candidate]:
+                weights[supporters(profile, candidate)] += 1
+            remaining[candidate] = False
+        scores = weighted_scores(counts * weights_vector[weights], profile)
+
+        ranking, steps = list(ranking), list(steps)
+        for _ in range(len(ranking), m):
+            scores[~remaining] = 0
+            steps.append(scores)
+            best_candidate = first_argmax(scores, self.tolerance)
             ranking.append(best_candidate)
-            for i in range(n):
-                if scores[i, best_candidate]:
-                    weights[i] += 1
-            scores[:, best_candidate] = False
+            if remaining[best_candidate]:
+                voters = supporters(profile, best_candidate)
+                decrease = counts[voters] * decreases[weights[voters]]
+                if sparse_profile or 4 * len(voters) < n_ballots:
+                    scores = scores - weighted_scores(decrease, rows[voters])
+                else:
+                    # copying the rows of many supporters is slower than a product with the
+                    # whole profile
+                    full_decrease = np.zeros(n_ballots)
+                    full_decrease[voters] = decrease
+                    scores = scores - weighted_scores(full_decrease, profile)
+                weights[voters] += 1
+            remaining[best_candidate] = False
 
+        self._steps = np.array(steps).reshape(len(steps), m)
         return ranking
 
+    def _update_voters(self, profile, ballots, sign):
+        """
+        Replay the last ranking with the scores of the new or removed voters added to the scores
+        of each step, and compute the ranking again only from the first step at which the best
+        candidate is not clearly the same.
+        """
+        ranking = getattr(self, '_cached_properties', dict()).get('ranking')
+        steps = getattr(self, '_steps', None)
+        self.set_profile(profile)
+        if ranking is None or steps is None:
+            return self
+
+        new_ballots, new_counts = weighted_ballots(ballots)
+        new_profile = as_float(new_ballots)
+        _, m = new_profile.shape
+        weights_vector = _pad_weights(self.weights_vector, m)
+        remaining = np.ones(m, dtype=bool)
+        weights = np.zeros(len(new_counts), dtype=int)
+        steps = steps.copy()
+        for t, candidate in enumerate(ranking):
+            scores = steps[t] + sign * weighted_scores(new_counts * weights_vector[weights],
+                                                       new_profile)
+            scores[~remaining] = 0
+            others = np.delete(scores, candidate)
+            margin = scores[candidate] - (others.max() if len(others) else -np.inf)
+            if not margin > 2 * self.tolerance * max(1, abs(scores[candidate])):
+                ballots, counts = weighted_ballots(self.profile)
+                ranking = self._greedy(ballots, counts, ranking[:t], steps[:t])
+                break
+            steps[t] = scores
+            if remaining[candidate]:
+                weights[supporters(new_profile, candidate)] += 1
+            remaining[candidate] = False
+        else:
+            self._steps = steps
+        self._cached_properties['ranking'] = ranking
+        return self
+
+    def rank_batch(self, profiles):
+        """
+        Compute the rankings of several elections with the same number of voters and
+        candidates at once. The greedy steps of all elections are done together, with one
+        batched matrix product per step. The profile of the rule is not changed.
+
+        Parameters
+        ----------
+        profiles: np.ndarray
+            A boolean tensor of shape (B, n, m). ``profiles[b]`` is the profile of election b.
+
+        Returns
+        -------
+        np.ndarray
+            A (B, m) array. ``rankings[b]`` is the ranking of election b.
+
+        """
+        approvals = np.asarray(profiles, dtype=bool)
+        n_elections, n, m = approvals.shape
+        profiles = approvals.astype(float)
+        elections = np.arange(n_elections)
+
+        weights_vector = _pad_weights(self._get_weights_vector(m), m)
+        remaining = np.ones((n_elections, m), dtype=bool)
+        weights = np.zeros((n_elections, n), dtype=int)
+        scores = weights_vector[0] * profiles.sum(axis=1)
+        rankings = np.zeros((n_elections, m), dtype=int)
+        for t in range(m):
+            scores[~remaining] = 0
+            best_candidates = first_argmax(scores, self.tolerance)
+            rankings[:, t] = best_candidates
+            satisfied = approvals[elections, :, best_candidates]
+            satisfied &= remaining[elections, best_candidates][:, None]
+            decrease = satisfied * (weights_vector[weights] - weights_vector[weights + 1])
+            scores -= np.matmul(decrease[:, None, :], profiles)[:, 0, :]
+            weights += satisfied
+            remaining[elections, best_candidates] = False
+
+        return rankings
+
 
 class SeqPAV(SeqRAV):
     """
@@ -115,11 +263,13 @@ class SeqPAV(SeqRAV):
         super().__init__(None, name)
         self.alpha = alpha
 
+    def _get_weights_vector(self, m):
+        return np.array([1/(i + self.alpha) for i in range(1, m+1)])
+
     def set_profile(self, profile):
-        self.profile = np.array(profile)
-        self.delete_cache()
+        super().set_profile(profile)
         _, m = self.profile.shape
-        self.weights_vector = np.array([1/(i + self.alpha) for i in range(1, m+1)])
+        self.weights_vector = self._get_weights_vector(m)
         return self
 
     def representation(self, alpha, lambd):
@@ -170,9 +320,11 @@ class GeometricPAV(SeqRAV):
         super().__init__(None, name)
         self.p = p
 
+    def _get_weights_vector(self, m):
+        return np.array([1/self.p**i for i in range(1, m+1)])
+
     def set_profile(self, profile):
-        self.profile = np.array(profile)
-        self.delete_cache()
+        super().set_profile(profile)
         _, m = self.profile.shape
-        self.weights_vector = np.array([1/self.p**i for i in range(1, m+1)])
+        self.weights_vector = self._get_weights_vector(m)
         return self
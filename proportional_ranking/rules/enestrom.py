@@ -1,4 +1,6 @@
 from proportional_ranking.rules.general import ProportionalRanking
+from proportional_ranking.utils.profiles import as_float, weighted_ballots, weighted_scores, supporters
+from proportional_ranking.utils.selection import chain_argmax
 import numpy as np
 import math
 
@@ -12,35 +14,35 @@ class enestrom(ProportionalRanking):
 
     def ranking(self):
         n, m = self.profile.shape
-        scores = self.profile.copy()
-        loads = [[] for _ in range(n)]
+        ballots, counts = weighted_ballots(self.profile)
+        profile = as_float(ballots)
+        remaining = np.ones(m, dtype=bool)
+        # supported[t, b] is True if the voters of ballot b approve the t-th candidate that
+        # gave them a load, and totals[t] is the number of voters approving this candidate
+        supported = np.zeros((m, len(counts)), dtype=bool)
+        totals = np.ones(m)
+        loaded = 0
         ranking = []
 
         for i in range(1, m+1):
             quota = n / (i + 1)
-            load_i = np.ones(n)
-            for k in range(n):
-                for total_score_i in loads[k]:
-                    if quota > total_score_i:
-                        load_i[k] = 0
-                    else:
-                        load_i[k] *= (1 - quota / total_score_i)
-
-            scores_vec = np.maximum(0, load_i).dot(scores)
-
-            j = -1
-            max_v = -1
-            for k in range(m):
-                if scores_vec[k] - max_v > 0.0001:
-                    j = k
-                    max_v = scores_vec[k]
-            ranking.append(j)
+            # the load of a voter is the product of the factors of its candidates, in the order
+            # of the ranking, and 0 if the quota exceeds the score of one of them
+            factors = np.where(quota > totals[:loaded, None], 0, 1 - quota / totals[:loaded, None])
+            load_i = np.where(supported[:loaded], factors, 1).prod(axis=0)
+
+            scores_vec = weighted_scores(counts * np.maximum(0, load_i), profile)
+            scores_vec[~remaining] = 0
 
-            av_score = np.sum(scores[:, j])
-            for k in range(n):
-                if scores[k, j]:
-                    loads[k].append(av_score)
+            j = chain_argmax(scores_vec, best=-1, index=-1)
+            ranking.append(j)
 
-            scores[:, j] = False
+            if remaining[j]:
+                voters = supporters(profile, j)
+                if len(voters):
+                    supported[loaded, voters] = True
+                    totals[loaded] = counts[voters].sum()
+                    loaded += 1
+            remaining[j] = False
 
         return ranking
@@ -1,6 +1,10 @@
-from proportional_ranking.utils.cache import DeleteCacheMixin, cached_property
-from proportional_ranking.utils.quality import quality, justify
+import hashlib
+
+from proportional_ranking.utils.cache import (DeleteCacheMixin, DiskCache, cached_method,
+                                              cached_property, disk_cached)
+from proportional_ranking.utils.quality import quality, quality_estimate, PrefixSatisfaction
 from proportional_ranking.utils.printing import print_ranking
+from proportional_ranking.utils.profiles import as_profile, drop_voters, profile_hash, stack_voters
 import numpy as np
 
 
@@ -17,23 +21,122 @@ class ProportionalRanking(DeleteCacheMixin):
     ----------
     name: str
         The name of the voting rule
-    profile: np.ndarray
+    profile: np.ndarray or scipy.sparse.csc_matrix
         A matrix representing an election.
         ``profile[i,j] = 1`` if voter i
-        approves candidate j
+        approves candidate j. Sparse profiles are kept sparse.
+    disk_cache: DiskCache
+        The persistent cache of the rankings, qualities and justifications, or None (see
+        :meth:`use_disk_cache`)
     """
+    disk_cache = None
+
     def __init__(self, name=""):
         self.profile = None
         self.name = name
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # the rankings of the subclasses are memoized until the profile changes, and looked
+        # for in the disk cache before being computed
+        if 'ranking' in cls.__dict__:
+            cls.ranking = cached_method(disk_cached(cls.__dict__['ranking']))
+
+    def use_disk_cache(self, cache):
+        """
+        Store the rankings, qualities and justifications computed by the rule in a persistent
+        cache, and reuse them for the same profile, rule and parameters.
+
+        Parameters
+        ----------
+        cache: DiskCache, str or None
+            The cache, or the path of its database. If None, the rule does not use a cache.
+
+        Returns
+        -------
+        ProportionalRanking
+            Itself
+
+        Examples
+        --------
+        >>> import os, tempfile
+        >>> from proportional_ranking.rules import SeqPAV
+        >>> cache = DiskCache(os.path.join(tempfile.mkdtemp(), 'cache.db'))
+        >>> rule = SeqPAV().use_disk_cache(cache).set_profile([[1, 1, 0], [0, 1, 1]])
+        >>> rule.ranking(), rule.quality
+        ([1, 0, 2], 1.0)
+        >>> len(cache)
+        2
+        >>> SeqPAV().use_disk_cache(cache).set_profile([[1, 1, 0], [0, 1, 1]]).quality
+        1.0
+        """
+        if isinstance(cache, str):
+            cache = DiskCache(cache)
+        self.disk_cache = cache
+        return self
+
+    def parameters(self):
+        """
+        The parameters of the rule, i.e. its public attributes except the profile, the name and
+        the cache.
+
+        Returns
+        -------
+        dict
+            The parameters of the rule
+        """
+        return {key: value for key, value in vars(self).items()
+                if not key.startswith('_') and key not in ('profile', 'name', 'disk_cache')}
+
+    @cached_property
+    def profile_key(self):
+        """
+        The hash of the current profile (see
+        :func:`~proportional_ranking.utils.profiles.profile_hash`).
+
+        Returns
+        -------
+        str
+            The hash of the profile
+        """
+        return profile_hash(self.profile)
+
+    def cache_key(self, name):
+        """
+        The key of a value in the disk cache. It is a hash of the profile, of the class of the
+        rule, of its parameters and of the name of the value.
+
+        Parameters
+        ----------
+        name: str
+            The name of the value, e.g. ``'ranking'``
+
+        Returns
+        -------
+        str
+            The key of the value
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.profile_key.encode())
+        digest.update(("%s.%s:%s" % (type(self).__module__, type(self).__qualname__, name)).encode())
+        for key, value in sorted(self.parameters().items()):
+            digest.update(key.encode())
+            array = np.asarray(value) if isinstance(value, (list, tuple, np.ndarray)) else None
+            if array is not None and array.dtype != object:
+                digest.update(("%s%s" % (array.dtype.str, array.shape)).encode())
+                digest.update(np.ascontiguousarray(array).tobytes())
+            else:
+                digest.update(repr(value).encode())
+        return digest.hexdigest()
+
     def set_profile(self, profile):
         """
         Update the profile of voters.
 
         Parameters
         ----------
-        profile: np.ndarray or list
-            The new profile of voters
+        profile: np.ndarray, list or scipy.sparse matrix
+            The new profile of voters. A sparse matrix is stored as a boolean CSC matrix.
 
         Returns
         -------
@@ -41,14 +144,76 @@ class ProportionalRanking(DeleteCacheMixin):
             Itself
 
         """
-        self.profile = np.array(profile)
+        self.profile = as_profile(profile)
         self.delete_cache()
         return self
 
-    @cached_property
+    def add_voters(self, ballots):
+        """
+        Add voters at the end of the profile. If the ranking was already computed, the rules
+        that support it update it incrementally, and the others compute it again.
+
+        Parameters
+        ----------
+        ballots: np.ndarray, list, scipy.sparse matrix or WeightedProfile
+            The ballots of the new voters
+
+        Returns
+        -------
+        ProportionalRanking
+            Itself
+
+        Examples
+        --------
+        >>> from proportional_ranking.rules import SeqPAV
+        >>> election = SeqPAV().set_profile([[1, 1, 0], [0, 1, 1]])
+        >>> election.ranking()
+        [1, 0, 2]
+        >>> election.add_voters([[0, 0, 1]] * 2).ranking()
+        [2, 1, 0]
+        """
+        return self._update_voters(stack_voters(self.profile, ballots), ballots, 1)
+
+    def remove_voters(self, voters):
+        """
+        Remove voters from the profile. If the ranking was already computed, the rules that
+        support it update it incrementally, and the others compute it again.
+
+        Parameters
+        ----------
+        voters: int list
+            The indices of the voters to remove (see
+            :func:`~proportional_ranking.utils.profiles.drop_voters`)
+
+        Returns
+        -------
+        ProportionalRanking
+            Itself
+
+        Examples
+        --------
+        >>> from proportional_ranking.rules import SeqPAV
+        >>> election = SeqPAV().set_profile([[1, 1, 0], [0, 1, 1], [0, 0, 1], [0, 0, 1]])
+        >>> election.ranking()
+        [2, 1, 0]
+        >>> election.remove_voters([2, 3]).ranking()
+        [1, 0, 2]
+        """
+        profile, removed = drop_voters(self.profile, voters)
+        return self._update_voters(profile, removed, -1)
+
+    def _update_voters(self, profile, ballots, sign):
+        """
+        Replace the profile after the voters of ``ballots`` were added (sign 1) or removed
+        (sign -1). By default, the ranking is computed again from scratch.
+        """
+        return self.set_profile(profile)
+
+    @cached_method
     def ranking(self):
         """
-        Compute a ranking of the candidates
+        Compute a ranking of the candidates. The ranking of every rule is memoized until the
+        profile is updated, so the returned list should not be modified.
 
         Returns
         -------
@@ -70,6 +235,21 @@ class ProportionalRanking(DeleteCacheMixin):
         print_ranking(self.ranking())
 
     @cached_property
+    def prefix_satisfaction(self):
+        """
+        Compute the satisfaction of voters with every prefix of the current ranking. It is
+        shared by :attr:`quality` and :attr:`justifiable`.
+
+        Returns
+        -------
+        PrefixSatisfaction
+            The satisfaction of voters with the prefixes of the ranking.
+
+        """
+        return PrefixSatisfaction(self.profile, self.ranking())
+
+    @cached_property
+    @disk_cached
     def quality(self):
         """
         Compute the quality of the current ranking. A quality > 1 means that
@@ -81,15 +261,17 @@ class ProportionalRanking(DeleteCacheMixin):
             The quality of the ranking.
 
         """
-        p = self.profile
-        r = self.ranking()
-        return quality(p, r)
+        prefix = self.prefix_satisfaction
+        return quality(prefix.profile, prefix.ranking, prefix=prefix)
 
     @cached_property
+    @disk_cached
     def justifiable(self):
         """
         Compute quickly if the ranking respects justified demand, i.e. if the quality is
-        > 1
+        >= 1. It is given by :attr:`quality`, which is polynomial in the number of voters,
+        instead of the enumeration of groups of voters of
+        :func:`~proportional_ranking.utils.quality.justify`.
 
         Returns
         -------
@@ -97,9 +279,32 @@ class ProportionalRanking(DeleteCacheMixin):
             If True, the ranking satisfy justified demand
 
         """
-        p = self.profile
-        r = self.ranking()
-        return justify(p, r)
+        return bool(self.quality >= 1)
+
+    def quality_estimate(self, budget=256, seed=None):
+        """
+        Estimate the quality of the current ranking from a search of at most ``budget`` cohesive
+        groups (see :func:`~proportional_ranking.utils.quality.quality_estimate`). It is an
+        upper bound of :attr:`quality`, for profiles with too many voters to compute it.
+
+        Parameters
+        ----------
+        budget : int
+            The maximal number of sets of candidates looked at
+        seed : int or np.random.Generator
+            The seed of the random search
+
+        Returns
+        -------
+        float
+            An upper bound of the quality of the ranking.
+        tuple
+            The candidates, the size of the prefix and the number of voters of the group
+            reaching this bound, or None.
+
+        """
+        prefix = self.prefix_satisfaction
+        return quality_estimate(prefix.profile, prefix.ranking, budget, seed, prefix=prefix)
 
     def name(self):
         """
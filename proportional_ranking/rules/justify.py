@@ -1,8 +1,9 @@
 from proportional_ranking.rules.general import ProportionalRanking
-from proportional_ranking.utils.quality import quality, justify
+from proportional_ranking.utils.quality import CohesiveGroups
 from proportional_ranking.utils.printing import print_ranking
 from proportional_ranking.rules.AV import AV
-from itertools import permutations
+from proportional_ranking.rules.SeqRAV import SeqPAV
+import numpy as np
 
 
 class Error(Exception):
@@ -26,7 +27,12 @@ class RankingNotFoundError(Error):
 class JustifiedRanking(ProportionalRanking):
     """
     This rule picks the first ranking it founds with quality >= 1, i.e. every justified demand
-    is fulfilled.
+    is fulfilled. The rankings are considered in lexicographic order.
+
+    Whether the justified demands for the first k positions are fulfilled only depends on the
+    set of the first k candidates. The rankings are built prefix by prefix with a depth-first
+    search, which backtracks as soon as a prefix does not fulfill a justified demand. Sets of
+    candidates that cannot start a justified ranking are not explored again.
 
     If no such ranking exists, it raises an error.
 
@@ -49,19 +55,44 @@ class JustifiedRanking(ProportionalRanking):
         super().__init__("JustifiedRanking")
 
     def ranking(self):
-        profile = self.profile
-        n, m = profile.shape
-        for ranking in list(permutations(range(m))):
-            if justify(profile, ranking):
-                return ranking
-
-        raise RankingNotFoundError("No ranking satisfy justify demand")
+        n, m = self.profile.shape
+        groups = CohesiveGroups(self.profile)
+        types = groups.types.astype(int)
+        dead_ends = set()
+
+        def search(prefix, mask, satisfaction):
+            k = len(prefix)
+            if k == m:
+                return tuple(prefix)
+            for candidate in range(m):
+                new_mask = mask | (1 << candidate)
+                if (mask >> candidate) & 1 or new_mask in dead_ends:
+                    continue
+                new_satisfaction = satisfaction + types[:, candidate]
+                if groups.min_ratio(new_satisfaction, k + 1) >= 1:
+                    result = search(prefix + [candidate], new_mask, new_satisfaction)
+                    if result is not None:
+                        return result
+                dead_ends.add(new_mask)
+            return None
+
+        ranking = search([], 0, np.zeros(len(types), dtype=int))
+        if ranking is None:
+            raise RankingNotFoundError(self.profile, "No ranking satisfy justify demand")
+        return ranking
 
 
 class MaximizeQuality(ProportionalRanking):
     """
     This rule picks the ranking with maximum quality, as defined in the paper
-    Proportional Rankings by Skowron et Al.
+    Proportional Rankings by Skowron et Al. If several rankings have the maximum quality,
+    the first one in lexicographic order is returned.
+
+    The quality of a ranking is the minimum over k of a value that only depends on the set of
+    the first k candidates. The rankings are built prefix by prefix with a branch and bound
+    search: the minimum over the fixed prefixes is an upper bound on the quality of every
+    ranking starting with this prefix, and branches that cannot beat the best ranking found
+    so far are pruned. The search starts with the ranking of SeqPAV as best ranking.
 
     Attributes
     ----------
@@ -82,13 +113,61 @@ class MaximizeQuality(ProportionalRanking):
 
     def ranking(self):
         n, m = self.profile.shape
-        max_q = 0
-        best_ranking = None
+        groups = CohesiveGroups(self.profile)
+        types = groups.types.astype(int)
+        prefix_quality = {}
+
+        def bound(mask, satisfaction, k):
+            # The quality of a prefix only depends on the set of its candidates
+            if mask not in prefix_quality:
+                prefix_quality[mask] = groups.min_ratio(satisfaction, k)
+            return prefix_quality[mask]
 
-        for ranking in list(permutations(range(m))):
-            q = quality(self.profile, ranking)
-            if q > max_q:
-                best_ranking = ranking
-                max_q = q
+        full = bound((1 << m) - 1, types.sum(axis=1), m) if m > 0 else np.inf
 
+        # The ranking of SeqPAV gives a first lower bound on the maximum quality
+        max_q = 0
+        best_ranking = None
+        found = False
+        seed = [int(c) for c in SeqPAV().set_profile(self.profile).ranking()]
+        # SeqPAV picks a ranked candidate again when the others have a score of 0, so the
+        # seed is completed with the candidates it missed
+        seed = list(dict.fromkeys(seed))
+        seed += [c for c in range(m) if c not in seed]
+        mask, satisfaction, q = 0, np.zeros(len(types), dtype=int), full
+        for k, candidate in enumerate(seed, 1):
+            mask |= 1 << candidate
+            satisfaction = satisfaction + types[:, candidate]
+            q = min(q, bound(mask, satisfaction, k))
+        if q > max_q:
+            max_q = q
+            best_ranking = tuple(seed)
+
+        # visited[mask] is the best bound of a prefix made of the candidates in mask. A later
+        # prefix with the same candidates and a lower bound cannot give a better ranking.
+        visited = {}
+
+        def search(prefix, mask, satisfaction, q):
+            nonlocal max_q, best_ranking, found
+            k = len(prefix)
+            if k == m:
+                if q > max_q or (q == max_q and best_ranking is not None and not found):
+                    max_q = q
+                    best_ranking = tuple(prefix)
+                    found = True
+                return
+            for candidate in range(m):
+                if (mask >> candidate) & 1:
+                    continue
+                new_mask = mask | (1 << candidate)
+                new_satisfaction = satisfaction + types[:, candidate]
+                new_q = min(q, bound(new_mask, new_satisfaction, k + 1))
+                if new_q < max_q or (new_q == max_q and (best_ranking is None or found)):
+                    continue
+                if visited.get(new_mask, -1) >= new_q:
+                    continue
+                visited[new_mask] = new_q
+                search(prefix + [candidate], new_mask, new_satisfaction, new_q)
+
+        search([], 0, np.zeros(len(types), dtype=int), full)
         return best_ranking
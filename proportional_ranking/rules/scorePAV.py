@@ -1,45 +1,155 @@
 from proportional_ranking.rules.general import ProportionalRanking
-from itertools import permutations
+from proportional_ranking.utils.profiles import voter_types
+from itertools import islice, permutations
+import numpy as np
 
 
 class ScorePAV(ProportionalRanking):
     """
     The rule is defined by Jérôme Lang in his Open Review.
+
+    A voter approving the candidates at positions i_1 < i_2 < ... of the ranking gets a utility
+    of ``scoring_vector[i_1] / 1 + scoring_vector[i_2] / 2 + ...``, and the rule picks the
+    ranking maximizing the total utility. If several rankings are optimal, the first one in
+    lexicographic order is returned.
+
+    The utility brought by the candidate at position t only depends on the set of candidates
+    ranked before it, so the optimal ranking is computed by dynamic programming over the sets
+    of candidates, with voters grouped by ballot. This is exponential in the number of
+    candidates only, instead of factorial.
+
+    Parameters
+    ----------
+    scoring_vector: float list
+        The scoring vector. By default, it is the Borda vector (m-1, m-2, ..., 0).
+
+    Examples
+    --------
+    >>> election = ScorePAV()
+    >>> election.set_profile([[1, 1, 1, 0, 0]]*5 + [[0, 0, 1, 1, 1]]*3)
+    <proportional_ranking.rules.scorePAV.ScorePAV object at ...>
+    >>> election.print_ranking()
+    c > a > b > d > e
     """
+
+    # Relative tolerance used to compare utilities of rankings
+    tolerance = 1e-9
+    # Number of rankings scored at once by the brute force search
+    batch_size = 1024
+
     def __init__(self, scoring_vector=None):
         super().__init__("scorePAV")
         self.scoring_vector = scoring_vector
 
+    def _get_scores(self, profile, rankings, vector):
+        """
+        Compute the total utility of a batch of rankings at once. Voters are grouped by ballot
+        and the position of each approved candidate among the approved ones is obtained with
+        a cumulative sum over the ranked ballots.
+
+        Parameters
+        ----------
+        profile: np.ndarray or WeightedProfile
+            The approval profile of voters
+        rankings: np.ndarray
+            The rankings, one per row
+        vector: float list
+            The scoring vector
+
+        Returns
+        -------
+        np.ndarray
+            The total utility of each ranking
+        """
+        types, counts = voter_types(profile)
+        rankings = np.asarray(rankings, dtype=int).reshape(len(rankings), -1)
+        m = rankings.shape[1]
+        scores = np.zeros(m)
+        vector = np.asarray(vector, dtype=float)[:m]
+        scores[:len(vector)] = vector
+
+        approved = types[:, rankings]
+        div = np.maximum(np.cumsum(approved, axis=2), 1)
+        utilities = np.where(approved, scores / div, 0).sum(axis=2)
+        return counts.dot(utilities)
+
     def _get_score(self, profile, ranking, vector):
-        m = len(ranking)
-        s_tot = 0
-        for approval in profile:
-            s = 0
-            div = 1
-            for i in range(m):
-                if approval[ranking[i]]:
-                    s += vector[i] / div
-                    div += 1
-            s_tot += s
-        return s_tot
+        return self._get_scores(profile, [ranking], vector)[0]
 
-    def ranking(self):
+    def _get_scoring_vector(self, m):
+        if self.scoring_vector is None:
+            return [(m-1-i) for i in range(m)]
+        return self.scoring_vector
+
+    def _brute_force_ranking(self):
+        """
+        Compute the ranking by scoring every permutation of the candidates. This is only
+        tractable for a few candidates.
+
+        Returns
+        -------
+        tuple
+            The first ranking of maximal score
+        """
         profile = self.profile
         n, m = profile.shape
 
-        scoring_vector = self.scoring_vector
-        if self.scoring_vector is None:
-            scoring_vector = [(m-1-i) for i in range(m)]
+        scoring_vector = self._get_scoring_vector(m)
 
         score_max = 0
         best = None
-        for ranking in list(permutations(range(m))):
-            new_score = self._get_score(profile, ranking, scoring_vector)
-            if new_score > score_max:
-                score_max = new_score
-                best = ranking
+        rankings = permutations(range(m))
+        while True:
+            batch = list(islice(rankings, self.batch_size))
+            if len(batch) == 0:
+                return best
+            new_scores = self._get_scores(profile, batch, scoring_vector)
+            i = np.argmax(new_scores)
+            if new_scores[i] > score_max:
+                score_max = new_scores[i]
+                best = batch[i]
+
+    def _gains(self, types, weights, mask, vector):
+        """
+        Utility brought by each candidate when it is added after the candidates in ``mask``.
+        """
+        m = types.shape[1]
+        in_mask = (mask >> np.arange(m)) & 1
+        position = int(in_mask.sum())
+        approved = types.dot(in_mask)
+        return vector[position] * (weights / (1 + approved)).dot(types), in_mask.astype(bool)
 
-        return best
+    def ranking(self):
+        n, m = self.profile.shape
+        types, counts = voter_types(self.profile)
+        types = types.astype(float)
+        vector = np.zeros(m)
+        scoring_vector = np.asarray(self._get_scoring_vector(m), dtype=float)[:m]
+        vector[:len(scoring_vector)] = scoring_vector
+
+        # best[mask] is the maximal utility brought by the candidates not in mask, when the
+        # candidates in mask are ranked first.
+        best = np.zeros(2 ** m)
+        bits = 1 << np.arange(m)
+        for mask in range(2 ** m - 2, -1, -1):
+            gains, ranked = self._gains(types, counts, mask, vector)
+            best[mask] = (gains + best[mask | bits])[~ranked].max()
+
+        if not best[0] > 0:
+            return None
+
+        # Rebuild the first optimal ranking in lexicographic order
+        ranking = []
+        mask = 0
+        for _ in range(m):
+            gains, ranked = self._gains(types, counts, mask, vector)
+            totals = gains + best[mask | bits]
+            target = best[mask] - self.tolerance * max(1, abs(best[mask]))
+            candidate = int(np.flatnonzero(~ranked & (totals >= target))[0])
+            ranking.append(candidate)
+            mask |= 1 << candidate
+
+        return tuple(ranking)
 
 
 class BordaPAV(ScorePAV):
@@ -49,4 +159,3 @@ class BordaPAV(ScorePAV):
     def __init__(self):
         super().__init__()
         self.name = "BordaPAV"
-
@@ -1,48 +1,60 @@
 from proportional_ranking.rules.general import ProportionalRanking
+from proportional_ranking.utils.profiles import (is_sparse, approval_scores, weighted_ballots, weighted_scores,
+                                                 supporters)
+from proportional_ranking.utils.selection import chain_argmax
 import numpy as np
 import math
-from fractions import Fraction
 
 
 class Phragmen(ProportionalRanking):
     """
     Phragmen's voting rule. See paper Proportional Ranking by Skowron et Al for more details.
 
-
+    Examples
+    --------
+    >>> election = Phragmen()
+    >>> election.set_profile([[1, 1, 1, 0, 0]]*5 + [[0, 0, 1, 1, 1]]*3)
+    <proportional_ranking.rules.seqPhragmen.Phragmen object at ...>
+    >>> election.print_ranking()
+    c > a > d > b > e
     """
 
     def __init__(self):
         super().__init__("Phragmen")
 
     def ranking(self):
-        n, m = self.profile.shape
+        profile, counts = weighted_ballots(self.profile)
+        _, m = profile.shape
 
-        scores = self.profile.copy()
-        load = np.zeros(n)
+        # rows of the profile, to get the ballots of the supporters of a candidate
+        ballots = profile.tocsr() if is_sparse(profile) else np.asarray(profile, dtype=bool)
+        approvals = approval_scores(self.profile)
+        # load of each voter of each ballot
+        load = np.zeros(len(counts))
+        # total load of the supporters of each candidate, i.e. (counts * load).dot(profile)
+        supporters_load = np.zeros(m)
         ranking = []
 
         for _ in range(m):
-            j = -1
-            min_v = np.infty
-            for k in range(m):
-                av_score = scores[:, k].sum()
-                if av_score == 0:
-                    if min_v == np.infty and k not in ranking:
-                        j = k
-                else:
-                    s = 1 + load.dot(scores[:, k])
-                    s /= av_score
-                    if min_v - s > 0.0001:
-                        j = k
-                        min_v = s
-
-            ranking.append(j)
+            # new maximal load if each remaining candidate is added
+            with np.errstate(divide='ignore', invalid='ignore'):
+                s = (1 + supporters_load) / approvals
+            s[approvals == 0] = np.inf
 
-            for k in range(n):
-                if scores[k, j]:
-                    load[k] = min_v
+            j = chain_argmax(-s)
+            if j == -1:
+                # no remaining candidate has a supporter
+                unranked = np.ones(m, dtype=bool)
+                unranked[ranking] = False
+                j = int(np.flatnonzero(unranked)[-1])
+            else:
+                voters = supporters(profile, j)
+                supporters_load += weighted_scores(counts[voters] * (s[j] - load[voters]),
+                                                   ballots[voters])
+                load[voters] = s[j]
 
-            scores[:, j] = False
+            ranking.append(j)
+            approvals[j] = 0
 
         return ranking
 
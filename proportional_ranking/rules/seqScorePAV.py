@@ -1,5 +1,5 @@
 from proportional_ranking.rules.general import ProportionalRanking
-from itertools import permutations
+from proportional_ranking.utils.profiles import voter_types
 import numpy as np
 
 
@@ -14,8 +14,19 @@ class SeqScorePAV(ProportionalRanking):
     If length(scorevector) < m, then we add 0's to the scorevector.
     If scorevector is only an int x, we set scorevector to (x,x,x,...).
     If scorevector equals 'b', we set scorevector to (m-1, m-2, ...).
+
+    Examples
+    --------
+    >>> election = SeqScorePAV([1, 1, 1, 1, 1])
+    >>> election.set_profile([[1, 1, 1, 0, 0]]*5 + [[0, 0, 1, 1, 1]]*3)
+    <proportional_ranking.rules.seqScorePAV.SeqScorePAV object at ...>
+    >>> election.print_ranking()
+    c > a > b > d > e
     """
 
+    # Relative tolerance under which two gains are considered equal
+    tolerance = 1e-9
+
     def __init__(self, scorevec='b'):
         super().__init__("seqScorePAV with " + str(scorevec))
         self.scorevec = scorevec
@@ -23,6 +34,7 @@ class SeqScorePAV(ProportionalRanking):
     def set_scorevector(self, scorevec):
         self.name = "seqScorePAV with " + str(scorevec)
         self.scorevec = scorevec
+        self.delete_cache()
 
     def __adjust_scorevector(self, num_cands):
         """
@@ -41,48 +53,35 @@ class SeqScorePAV(ProportionalRanking):
             scorevec += [0] * (num_cands - len(scorevec))
         return scorevec
 
-    def __individual_utility(self, voter, ranking, scorevec):
-        """ Compute utility a voter obtains from a ranking. """
-
-        utils = 0
-        k = 0
-        for rank, cand in enumerate(ranking):
-            if self.profile[voter][cand]:
-                k += 1
-                utils += scorevec[rank] / k
-        return utils
-
-    def _overall_utility(self, num_voters, ranking, scorevec):
-        """ Compute utility all voters obtain from a ranking. """
-
-        utils = 0
-        for voter in range(num_voters):
-            utils += self.__individual_utility(voter, ranking, scorevec)
-        return utils
-
     def ranking(self):
-        """ Compute ranking w.r.t. self.scorevec. """
+        """
+        Compute ranking w.r.t. self.scorevec.
+
+        Each voter type keeps the number of its approved candidates already in the ranking.
+        Adding candidate c at position t then brings a utility of
+        ``scorevec[t] * sum_v profile[v, c] / (count_v + 1)`` to the voters, which is computed
+        for every candidate with one matrix-vector product.
+        """
 
-        profile = self.profile
-        n, m = profile.shape
-        scorevec = self.__adjust_scorevector(m)
+        n, m = self.profile.shape
+        scorevec = np.asarray(self.__adjust_scorevector(m), dtype=float)
+        types, counts = voter_types(self.profile)
+        types = types.astype(float)
 
         # construct ranking
         ranking = []
-        for _ in range(m):
-            next_cand = -1
-            best_gain = -1
-            without_cand = self._overall_utility(n, ranking, scorevec)
-            for cand in range(m):
-                if cand in ranking:
-                    continue
-                # compute gain in utility this candidate invokes
-                with_cand = self._overall_utility(n, ranking + [cand], scorevec)
-                if with_cand - without_cand > best_gain:
-                    next_cand = cand
-                    best_gain = with_cand - without_cand
+        approved = np.zeros(len(types))
+        remaining = np.ones(m, dtype=bool)
+        for t in range(m):
+            # compute gain in utility each candidate invokes
+            gains = scorevec[t] * (counts / (approved + 1)).dot(types)
+            gains[~remaining] = -np.inf
+            best_gain = gains.max()
+            next_cand = int(np.flatnonzero(gains >= best_gain - self.tolerance * max(1, abs(best_gain)))[0])
             # append cand with best gain to ranking
             ranking.append(next_cand)
+            approved += types[:, next_cand]
+            remaining[next_cand] = False
 
         return ranking
 
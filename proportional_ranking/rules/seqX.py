@@ -1,37 +1,73 @@
 from proportional_ranking.rules.general import ProportionalRanking
-from itertools import permutations
+from proportional_ranking.utils.profiles import weighted_ballots, to_dense
 from fractions import Fraction
 
+import heapq
 import numpy as np
 
+
 class seqX(ProportionalRanking):
     """
     Sequential version of Rule X. By default uses an increment of 1/n.
+
+    Two numeric backends are available. With ``backend='fraction'``, budgets are exact
+    fractions. With ``backend='float'``, budgets are float64 and the minimal q of every
+    candidate is computed at once by sorting the budgets of its supporters. Values closer
+    than ``tolerance`` are considered equal.
+
+    In both backends, the affordable candidates are kept in a priority queue ordered by
+    minimal q. When a candidate is bought, only the candidates sharing a supporter with it
+    get a new minimal q, and outdated entries of the queue are skipped.
+
+    Voters with the same ballot always have the same budget, so budgets are stored per ballot
+    (see :class:`~proportional_ranking.utils.profiles.WeightedProfile`).
+
+    Parameters
+    ----------
+    increment: float
+        The budget given to each voter at each round. If 0, it is 1/n.
+    backend: str
+        Either 'fraction' or 'float'.
+
+    Examples
+    --------
+    >>> election = seqX()
+    >>> election.set_profile([[1, 1, 1, 0, 0]]*5 + [[0, 0, 1, 1, 1]]*3)
+    <proportional_ranking.rules.seqX.seqX object at ...>
+    >>> election.print_ranking()
+    c > a > d > b > e
+    >>> seqX(backend='float').set_profile([[1, 1, 1, 0, 0]]*5 + [[0, 0, 1, 1, 1]]*3).ranking()
+    [2, 0, 3, 1, 4]
     """
 
-    def __init__(self, increment=0):
+    backends = ('fraction', 'float')
+    tolerance = 1e-9
+
+    def __init__(self, increment=0, backend='fraction'):
         self.incr = max(0, increment)
+        if backend not in self.backends:
+            raise ValueError("Unknown backend %s, should be one of %s" % (backend, self.backends))
+        self.backend = backend
         super().__init__("seqX with " + str(self.incr))
 
     def set_increment(self, increment):
         self.incr = max(0, increment)
         self.name = "seqScorePAV with " + str(self.incr)
+        self.delete_cache()
 
-    def __get_min_q(self, budgets, cand):
+    def __get_min_q(self, budgets, cand, ballots, counts):
         """
         Compute minimal q for Rule X and seqX.
         Shamelessly copied and adpated from Martin Lackners code.
         """
 
-        profile = self.profile
-
-        rich = set([v for v, pref in enumerate(profile)
+        rich = set([v for v, pref in enumerate(ballots)
                     if pref[cand]])
         poor = set()
 
         while len(rich) > 0:
-            poor_budget = sum(budgets[v] for v in poor)
-            q = Fraction(1 - poor_budget, len(rich))
+            poor_budget = sum(counts[v] * budgets[v] for v in poor)
+            q = Fraction(1 - poor_budget, sum(counts[v] for v in rich))
             new_poor = set([v for v in rich
                             if budgets[v] < q])
             if len(new_poor) == 0:
@@ -41,20 +77,97 @@ class seqX(ProportionalRanking):
 
         return None  # not sufficient budget available
 
-    def ranking(self):
-        """ Compute ranking w.r.t. self.incr. """
+    def _min_q_float(self, budgets, candidates, ballots, counts):
+        """
+        Compute the minimal q of several candidates at once with float budgets.
+
+        If the supporters of a candidate are sorted by budget, and the first r of them give
+        all their budget, the others pay ``q_r = (1 - sum of the r first budgets) / (s - r)``
+        where s is the number of supporters. The minimal q is q_r for the smallest r such
+        that the (r+1)-th budget is at least q_r. Voters with the same ballot have the same
+        budget, so r only has to be tried at the boundaries between ballots.
 
-        profile = self.profile
-        n, m = profile.shape
+        Parameters
+        ----------
+        budgets: np.ndarray
+            The budget of the voters of each ballot
+        candidates: np.ndarray
+            The candidates
+        ballots: np.ndarray
+            The ballots of the profile
+        counts: np.ndarray
+            The number of voters of each ballot
+
+        Returns
+        -------
+        np.ndarray
+            The minimal q of each candidate, ``np.inf`` if the candidate is not affordable.
+        """
+        supporters = ballots[:, candidates]
+        budgets = np.where(supporters, budgets[:, None], np.inf)
+        order = np.argsort(budgets, axis=0, kind='stable')
+        sorted_budgets = np.take_along_axis(budgets, order, axis=0)
+        sorted_counts = np.take_along_axis(np.where(supporters, counts[:, None], 0), order, axis=0)
+        n_supporters = sorted_counts.sum(axis=0)
+        paid_budgets = np.where(np.isfinite(sorted_budgets), sorted_budgets, 0) * sorted_counts
+        paid = np.cumsum(paid_budgets, axis=0) - paid_budgets
+        r = np.cumsum(sorted_counts, axis=0) - sorted_counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q = (1 - paid) / (n_supporters - r)
+        stop = (r < n_supporters) & (sorted_budgets >= q - self.tolerance)
+        affordable = stop.any(axis=0)
+        first = np.argmax(stop, axis=0)
+        return np.where(affordable, q[first, np.arange(len(candidates))], np.inf)
 
-        budgets = {v: 0 for v in range(n)}
-        candidates = range(m)
+    def _ballots(self):
+        """
+        The ballots of the profile as a dense boolean matrix, and the number of voters of
+        each ballot.
+        """
+        ballots, counts = weighted_ballots(self.profile)
+        return np.asarray(to_dense(ballots), dtype=bool), counts
+
+    def _neighbours(self, ballots):
+        """
+        ``neighbours[c, d]`` is True if candidates c and d have at least one common supporter.
+        Buying c only changes the minimal q of its neighbours.
+        """
+        ballots = np.asarray(ballots, dtype=float)
+        return ballots.T.dot(ballots) > 0
+
+    def _pop_cheapest(self, heap, min_q, remaining, tolerance):
+        """
+        Pop the remaining candidate with minimal q from the heap. Candidates whose q is within
+        ``tolerance`` of the minimum are ties, broken by the lowest index. Entries that are
+        outdated (the candidate is ranked or its q changed) are skipped.
+        """
+        ties = []
+        while heap and (not ties or heap[0][0] <= ties[0][0] + tolerance):
+            q, c = heapq.heappop(heap)
+            if remaining[c] and min_q[c] == q:
+                ties.append((q, c))
+        if not ties:
+            return None
+        best = min(ties, key=lambda entry: entry[1])
+        for entry in ties:
+            if entry is not best:
+                heapq.heappush(heap, entry)
+        return best[1]
+
+    def _ranking_fraction(self):
+        n, m = self.profile.shape
+        ballots, counts = self._ballots()
+        counts = [int(c) for c in counts]
+        neighbours = self._neighbours(ballots)
+
+        budgets = {v: 0 for v in range(len(counts))}
+        remaining = np.ones(m, dtype=bool)
         ranking = []
         if self.incr == 0:
             # use 1/n as budget increase
             budget_increase = Fraction(1, n)
         else:
-            budget_increase = self.incr
+            budget_increase = Fraction(str(self.incr))
 
         while len(ranking) < m:
             # setting up new budgets
@@ -62,27 +175,64 @@ class seqX(ProportionalRanking):
                 budgets[voter] = budget + budget_increase
 
             # reimplement RuleX to get the committee, the remaining budget
-            enough_budget = 1
-            while enough_budget:
-                curr_cands = set(candidates) - set(ranking)
-                min_q = {}
-                for c in curr_cands:
-                    q = self.__get_min_q(budgets, c)
-                    if q is not None:
-                        min_q[c] = q
-                if len(min_q) > 0:
-                    # i.e., one or more candidates are affordable
-                    next_cands = [c for c in min_q.keys()
-                                if min_q[c] == min(min_q.values())]
-                    for next_cand in next_cands:
-                        new_budgets = dict(budgets)
-                        for v, pref in enumerate(profile):
-                            if next_cand in pref:
-                                new_budgets[v] -= min(budgets[v], min_q[next_cand])
-                        ranking += [next_cand]
-                        budgets = new_budgets
-                        break
-                else:   # no candidate is affordable or committee is full
-                    enough_budget = 0
+            min_q = {c: self.__get_min_q(budgets, c, ballots, counts)
+                     for c in np.flatnonzero(remaining)}
+            heap = [(q, c) for c, q in min_q.items() if q is not None]
+            heapq.heapify(heap)
+            while True:
+                next_cand = self._pop_cheapest(heap, min_q, remaining, 0)
+                if next_cand is None:
+                    # no candidate is affordable or committee is full
                     break
+                q = min_q[next_cand]
+                for v, pref in enumerate(ballots):
+                    if pref[next_cand]:
+                        budgets[v] -= min(budgets[v], q)
+                ranking += [int(next_cand)]
+                remaining[next_cand] = False
+                # only the candidates sharing a supporter with next_cand have a new q
+                for c in np.flatnonzero(neighbours[next_cand] & remaining):
+                    min_q[c] = self.__get_min_q(budgets, c, ballots, counts)
+                    if min_q[c] is not None:
+                        heapq.heappush(heap, (min_q[c], c))
         return ranking
+
+    def _ranking_float(self):
+        n, m = self.profile.shape
+        ballots, counts = self._ballots()
+        neighbours = self._neighbours(ballots)
+
+        budgets = np.zeros(len(counts))
+        remaining = np.ones(m, dtype=bool)
+        ranking = []
+        budget_increase = 1 / n if self.incr == 0 else self.incr
+
+        while len(ranking) < m:
+            budgets += budget_increase
+            min_q = np.full(m, np.inf)
+            candidates = np.flatnonzero(remaining)
+            min_q[candidates] = self._min_q_float(budgets, candidates, ballots, counts)
+            heap = [(min_q[c], c) for c in candidates if np.isfinite(min_q[c])]
+            heapq.heapify(heap)
+            while True:
+                next_cand = self._pop_cheapest(heap, min_q, remaining, self.tolerance)
+                if next_cand is None:
+                    break
+                supporters = ballots[:, next_cand]
+                budgets[supporters] -= np.minimum(budgets[supporters], min_q[next_cand])
+                remaining[next_cand] = False
+                ranking.append(int(next_cand))
+                # only the candidates sharing a supporter with next_cand have a new q
+                affected = np.flatnonzero(neighbours[next_cand] & remaining)
+                min_q[affected] = self._min_q_float(budgets, affected, ballots, counts)
+                for c in affected:
+                    if np.isfinite(min_q[c]):
+                        heapq.heappush(heap, (min_q[c], c))
+        return ranking
+
+    def ranking(self):
+        """ Compute ranking w.r.t. self.incr. """
+
+        if self.backend == 'float':
+            return self._ranking_float()
+        return self._ranking_fraction()
@@ -1,4 +1,7 @@
 from proportional_ranking.rules.general import ProportionalRanking
+from proportional_ranking.utils.profiles import (as_float, approval_scores, weighted_ballots, weighted_scores,
+                                                 supporters)
+from proportional_ranking.utils.selection import chain_argmax, chain_argmax_rows
 import numpy as np
 
 
@@ -8,33 +11,76 @@ class sumLoads(ProportionalRanking):
         self.name = "sumLoads"
 
     def ranking(self):
-        profile = self.profile
-        n, m = profile.shape
+        n, m = self.profile.shape
+        ballots, counts = weighted_ballots(self.profile)
+        profile = as_float(ballots)
 
-        scores = profile.copy()
-        load = np.zeros(n)
+        # number of voters approving each candidate
+        approvals = approval_scores(self.profile)
+        remaining = np.ones(m, dtype=bool)
+        load = np.zeros(len(counts))
         ranking = []
 
         for i in range(1, m+1):
             quota = n / (i + 1)
             load_k = quota * load
-            s = (1 - np.minimum(1, load_k)).dot(scores)
-
-            j = 0
-            max_v = s[0]
-            for k in range(m):
-                if s[k] - max_v > 0.0001:
-                    j = k
-                    max_v = s[j]
+            s = weighted_scores(counts * (1 - np.minimum(1, load_k)), profile)
+            s[~remaining] = 0
 
+            j = chain_argmax(s, best=s[0], index=0)
             ranking.append(j)
 
-            total_score = np.sum(scores[:, j])
-            for k in range(n):
-                if scores[k, j]:
-                    load[k] += 1 / total_score
-
-            scores[:, j] = False
+            if remaining[j] and approvals[j] > 0:
+                load[supporters(profile, j)] += 1 / approvals[j]
+            remaining[j] = False
 
         return ranking
 
+    def rank_batch(self, profiles):
+        """
+        Compute the rankings of several elections with the same number of voters and
+        candidates at once. The steps of all elections are done together, with one batched
+        matrix product per step. The profile of the rule is not changed.
+
+        Parameters
+        ----------
+        profiles: np.ndarray
+            A boolean tensor of shape (B, n, m). ``profiles[b]`` is the profile of election b.
+
+        Returns
+        -------
+        np.ndarray
+            A (B, m) array. ``rankings[b]`` is the ranking of election b.
+
+        Examples
+        --------
+        >>> sumLoads().rank_batch([[[1, 1, 0], [0, 1, 1]], [[1, 0, 1], [0, 1, 1]]])
+        array([[1, 0, 2],
+               [2, 0, 1]])
+        """
+        approvals = np.asarray(profiles, dtype=bool)
+        n_elections, n, m = approvals.shape
+        profiles = approvals.astype(float)
+        elections = np.arange(n_elections)
+
+        # number of voters approving each candidate, in each election
+        totals = profiles.sum(axis=1)
+        remaining = np.ones((n_elections, m), dtype=bool)
+        load = np.zeros((n_elections, n))
+        rankings = np.zeros((n_elections, m), dtype=int)
+        for i in range(1, m+1):
+            quota = n / (i + 1)
+            load_k = quota * load
+            s = np.matmul((1 - np.minimum(1, load_k))[:, None, :], profiles)[:, 0, :]
+            s[~remaining] = 0
+
+            j = chain_argmax_rows(s, best=s[:, 0], index=0)
+            rankings[:, i - 1] = j
+            total = totals[elections, j]
+            loaded = remaining[elections, j] & (total > 0)
+            increment = np.zeros(n_elections)
+            increment[loaded] = 1 / total[loaded]
+            load += approvals[elections, :, j] * increment[:, None]
+            remaining[elections, j] = False
+
+        return rankings
@@ -1,2 +1,4 @@
 from proportional_ranking.utils.printing import *
+from proportional_ranking.utils.profiles import *
 from proportional_ranking.utils.quality import *
+from proportional_ranking.utils.selection import *
@@ -1,28 +1,38 @@
+import functools
+import pickle
+import sqlite3
+import time
+
 
 def _cache(f):
     """
-    Auxiliary decorator used by ``cached_property``.
+    Auxiliary decorator used by ``cached_property`` and ``cached_method``.
 
     :param f: a method with no argument (except ``self``).
-    :return: the same function, but with a `caching' behavior.
+    :return: the same function, but with a `caching' behavior. Hits and misses of the cache are
+        counted, cf. :meth:`DeleteCacheMixin.cache_info`.
     """
     name = f.__name__
 
     # noinspection PyProtectedMember
-    def _f(*args):
+    @functools.wraps(f)
+    def _f(self):
+        counters = self.__dict__.setdefault('_cache_counters', dict())
+        counter = counters.setdefault(name, [0, 0])
         try:
-            return args[0]._cached_properties[name]
+            value = self._cached_properties[name]
+            counter[0] += 1
+            return value
         except KeyError:
             # Not stored in cache
-            value = f(*args)
-            args[0]._cached_properties[name] = value
-            return value
+            pass
         except AttributeError:
             # cache does not even exist
-            value = f(*args)
-            args[0]._cached_properties = {name: value}
-            return value
-    _f.__doc__ = f.__doc__
+            self._cached_properties = dict()
+        counter[1] += 1
+        value = f(self)
+        self._cached_properties[name] = value
+        return value
     return _f
 
 
@@ -38,17 +48,30 @@ def cached_property(f):
     return property(_cache(f))
 
 
+def cached_method(f):
+    """
+    Decorator putting the value of a method without argument in cache automatically. It
+    is the same as :meth:`cached_property`, but the value is obtained by calling the method.
+
+    Cf. :class:`DeleteCacheMixin` for an example.
+    """
+    return _cache(f)
+
+
 class DeleteCacheMixin:
     """
     Mixin used to delete cached properties.
 
-    Cf. decorator :meth:`cached_property`.
+    Cf. decorators :meth:`cached_property` and :meth:`cached_method`.
 
     >>> class Example(DeleteCacheMixin):
     ...     @cached_property
     ...     def x(self):
     ...         print('Big computation...')
     ...         return 6 * 7
+    ...     @cached_method
+    ...     def y(self):
+    ...         return self.x + 1
     >>> a = Example()
     >>> a.x
     Big computation...
@@ -56,10 +79,160 @@ class DeleteCacheMixin:
     >>> a.x
     42
     >>> a.delete_cache()
-    >>> a.x
+    >>> a.y()
     Big computation...
-    42
+    43
+    >>> a.y()
+    43
+    >>> a.cache_info()
+    {'x': {'hits': 1, 'misses': 2}, 'y': {'hits': 1, 'misses': 1}}
     """
 
     def delete_cache(self) -> None:
         self._cached_properties = dict()
+
+    def cache_info(self) -> dict:
+        """
+        The number of hits and misses of the cache for each cached property or method, since
+        the creation of the object. They are not reset by :meth:`delete_cache`.
+
+        :return: a dictionary ``{name: {'hits': hits, 'misses': misses}}``.
+        """
+        counters = self.__dict__.get('_cache_counters', dict())
+        return {name: {'hits': hits, 'misses': misses} for name, (hits, misses) in counters.items()}
+
+
+def disk_cached(f):
+    """
+    Decorator storing the value of a method without argument in the disk cache of the object,
+    if it has one.
+
+    The object must have a ``disk_cache`` attribute, which is None or a :class:`DiskCache`,
+    and a ``cache_key(name)`` method giving the key of the value in the cache. Cf.
+    :meth:`~proportional_ranking.rules.general.ProportionalRanking.use_disk_cache`.
+
+    :param f: a method with no argument (except ``self``).
+    :return: the same function, but looking for its value in the disk cache first.
+    """
+    name = f.__name__
+
+    @functools.wraps(f)
+    def _f(self):
+        cache = self.disk_cache
+        if cache is None:
+            return f(self)
+        key = self.cache_key(name)
+        try:
+            return cache[key]
+        except KeyError:
+            value = f(self)
+            cache[key] = value
+            return value
+    return _f
+
+
+class DiskCache:
+    """
+    Persistent key-value store, backed by a sqlite database.
+
+    Values are pickled. When the cache holds more than ``max_entries`` values, the least
+    recently used ones are evicted. The database can be shared by several processes, and a
+    cache can be pickled (the connection is opened again when needed).
+
+    Parameters
+    ----------
+    path : str
+        The path of the database file. It is created if needed.
+    max_entries : int
+        The maximal number of values in the cache
+
+    Examples
+    --------
+    >>> import os, tempfile
+    >>> cache = DiskCache(os.path.join(tempfile.mkdtemp(), 'cache.db'), max_entries=2)
+    >>> cache['a'] = [1, 2]
+    >>> cache['b'] = None
+    >>> cache['a']
+    [1, 2]
+    >>> cache['c'] = 3
+    >>> 'a' in cache, 'b' in cache, len(cache)
+    (True, False, 2)
+    >>> cache.close()
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._connection = None
+
+    @property
+    def connection(self):
+        """
+        The connection to the database, opened on first use.
+
+        Returns
+        -------
+        sqlite3.Connection
+            The connection
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            with self._connection:
+                self._connection.execute("CREATE TABLE IF NOT EXISTS entries "
+                                         "(key TEXT PRIMARY KEY, value BLOB, last_used INTEGER)")
+                self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used "
+                                         "ON entries (last_used)")
+        return self._connection
+
+    def __getitem__(self, key):
+        with self.connection as connection:
+            row = connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            connection.execute("UPDATE entries SET last_used = ? WHERE key = ?",
+                               (time.time_ns(), key))
+        return pickle.loads(row[0])
+
+    def __setitem__(self, key, value):
+        with self.connection as connection:
+            connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                               (key, pickle.dumps(value), time.time_ns()))
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                connection.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries "
+                                   "ORDER BY last_used LIMIT ?)", (excess,))
+
+    def __contains__(self, key):
+        return self.connection.execute("SELECT 1 FROM entries WHERE key = ?",
+                                       (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def clear(self):
+        """
+        Remove every value from the cache.
+
+        Returns
+        -------
+        None
+        """
+        with self.connection as connection:
+            connection.execute("DELETE FROM entries")
+
+    def close(self):
+        """
+        Close the connection to the database. It is opened again if the cache is used.
+
+        Returns
+        -------
+        None
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
@@ -0,0 +1,498 @@
+import hashlib
+
+import numpy as np
+
+try:
+    import scipy.sparse as sparse
+except ImportError:  # pragma: no cover
+    sparse = None
+
+
+def is_sparse(profile):
+    """
+    This function checks if a profile is stored as a scipy sparse matrix.
+
+    Parameters
+    ----------
+    profile : np.ndarray or scipy.sparse matrix
+        The approval profile of voters
+
+    Returns
+    -------
+    bool
+        True if the profile is a scipy sparse matrix
+
+    Examples
+    --------
+    >>> is_sparse([[1, 0], [0, 1]])
+    False
+    """
+    if isinstance(profile, np.ndarray):
+        return False
+    return sparse is not None and sparse.issparse(profile)
+
+
+def as_profile(profile):
+    """
+    This function converts a profile to the representation used by the rules. Sparse
+    matrices are kept sparse, as boolean CSC matrices without explicit zeros, so that the
+    supporters of a candidate are a contiguous slice. Weighted profiles are kept as they are.
+    Every other input becomes a numpy array.
+
+    Parameters
+    ----------
+    profile : np.ndarray, list, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+
+    Returns
+    -------
+    np.ndarray, scipy.sparse.csc_matrix or WeightedProfile
+        The profile
+
+    Examples
+    --------
+    >>> as_profile([[1, 0], [0, 1]])
+    array([[1, 0],
+           [0, 1]])
+    """
+    if isinstance(profile, WeightedProfile):
+        return profile
+    if is_sparse(profile):
+        profile = sparse.csc_matrix(profile, dtype=bool)
+        profile.eliminate_zeros()
+        profile.sort_indices()
+        return profile
+    return np.array(profile)
+
+
+def to_dense(profile):
+    """
+    This function returns a dense version of a profile, with one row per voter. Dense profiles
+    are returned as they are.
+
+    Parameters
+    ----------
+    profile : np.ndarray, list, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+
+    Returns
+    -------
+    np.ndarray
+        The dense profile
+
+    Examples
+    --------
+    >>> to_dense([[1, 0], [0, 1]])
+    array([[1, 0],
+           [0, 1]])
+    """
+    if is_sparse(profile) or isinstance(profile, WeightedProfile):
+        return profile.toarray()
+    return np.asarray(profile)
+
+
+def as_float(profile):
+    """
+    This function converts a profile to floats, so that the products with the weights of the
+    voters do not convert it again at every step of a sequential rule.
+
+    Parameters
+    ----------
+    profile : np.ndarray or scipy.sparse matrix
+        The approval profile of voters
+
+    Returns
+    -------
+    np.ndarray or scipy.sparse matrix
+        The profile, with float entries
+
+    Examples
+    --------
+    >>> as_float(np.array([[True, False]]))
+    array([[1., 0.]])
+    """
+    if is_sparse(profile):
+        return profile.astype(float)
+    return np.asarray(profile, dtype=float)
+
+
+def approval_scores(profile):
+    """
+    This function computes the number of approvals of every candidate.
+
+    Parameters
+    ----------
+    profile : np.ndarray, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+
+    Returns
+    -------
+    np.ndarray
+        The approval score of each candidate
+
+    Examples
+    --------
+    >>> approval_scores(np.array([[1, 0, 1], [0, 1, 1]]))
+    array([1, 1, 2])
+    """
+    if isinstance(profile, WeightedProfile):
+        return profile.counts.dot(profile.ballots)
+    if is_sparse(profile):
+        return np.asarray((profile != 0).sum(axis=0)).ravel()
+    return np.asarray(profile).sum(axis=0)
+
+
+def ballot_sizes(profile):
+    """
+    This function computes the number of candidates approved by every voter.
+
+    Parameters
+    ----------
+    profile : np.ndarray or scipy.sparse matrix
+        The approval profile of voters
+
+    Returns
+    -------
+    np.ndarray
+        The number of approved candidates of each voter
+
+    Examples
+    --------
+    >>> ballot_sizes(np.array([[1, 0, 1], [0, 1, 1]]))
+    array([2, 2])
+    """
+    if is_sparse(profile):
+        return np.asarray((profile != 0).sum(axis=1)).ravel()
+    return np.asarray(profile).sum(axis=1)
+
+
+def weighted_scores(weights, profile):
+    """
+    This function computes the score of every candidate when each voter gives its weight to
+    all the candidates it approves, i.e. ``weights.dot(profile)``.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        The weight of each voter
+    profile : np.ndarray or scipy.sparse matrix
+        The approval profile of voters
+
+    Returns
+    -------
+    np.ndarray
+        The score of each candidate
+
+    Examples
+    --------
+    >>> weighted_scores(np.array([1, 0.5]), np.array([[1, 0, 1], [0, 1, 1]]))
+    array([1. , 0.5, 1.5])
+    """
+    weights = np.asarray(weights)
+    if is_sparse(profile):
+        return np.asarray(profile.T.dot(weights)).ravel()
+    return weights.dot(profile)
+
+
+def supporters(profile, candidate):
+    """
+    This function returns the voters approving a candidate.
+
+    Parameters
+    ----------
+    profile : np.ndarray or scipy.sparse matrix
+        The approval profile of voters
+    candidate : int
+        The index of the candidate
+
+    Returns
+    -------
+    np.ndarray
+        The indices of the voters approving the candidate, in increasing order
+
+    Examples
+    --------
+    >>> supporters(np.array([[1, 0, 1], [0, 1, 1]]), 2)
+    array([0, 1])
+    """
+    if is_sparse(profile):
+        profile = profile.tocsc()
+        start, end = profile.indptr[candidate], profile.indptr[candidate + 1]
+        voters = profile.indices[start:end][profile.data[start:end] != 0]
+        return np.sort(voters)
+    return np.flatnonzero(np.asarray(profile)[:, candidate])
+
+
+def weighted_ballots(profile):
+    """
+    This function returns the ballots of a profile and the number of voters casting each of
+    them. The ballots of a weighted profile are its distinct ballots, and the ballots of any
+    other profile are the rows of the profile, cast by one voter each.
+
+    Parameters
+    ----------
+    profile : np.ndarray, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+
+    Returns
+    -------
+    np.ndarray or scipy.sparse matrix
+        The ballots, one row per ballot
+    np.ndarray
+        The number of voters casting each ballot
+
+    Examples
+    --------
+    >>> ballots, counts = weighted_ballots(WeightedProfile([[1, 0], [1, 0], [0, 1]]))
+    >>> ballots.astype(int)
+    array([[0, 1],
+           [1, 0]])
+    >>> counts
+    array([1, 2])
+    """
+    if isinstance(profile, WeightedProfile):
+        return profile.ballots, profile.counts
+    if not is_sparse(profile):
+        profile = np.asarray(profile)
+    return profile, np.ones(profile.shape[0], dtype=int)
+
+
+def voter_types(profile, return_index=False, return_inverse=False):
+    """
+    This function groups the voters with the same ballot.
+
+    Parameters
+    ----------
+    profile : np.ndarray, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+    return_index : bool
+        If True, also return the first row of the profile with each ballot
+    return_inverse : bool
+        If True, also return the type of each row of the profile
+
+    Returns
+    -------
+    np.ndarray
+        The distinct ballots of the profile, one row per voter type
+    np.ndarray
+        The first row of each type, only if ``return_index`` is True
+    np.ndarray
+        The type of each row, only if ``return_inverse`` is True
+    np.ndarray
+        The number of voters of each type
+
+    Examples
+    --------
+    >>> types, counts = voter_types([[1, 0, 1], [0, 1, 1], [1, 0, 1]])
+    >>> types.astype(int)
+    array([[0, 1, 1],
+           [1, 0, 1]])
+    >>> counts
+    array([1, 2])
+    >>> voter_types(WeightedProfile([[1, 0, 1], [0, 1, 1]], [4, 1]))[1]
+    array([1, 4])
+    """
+    ballots, weights = weighted_ballots(profile)
+    ballots = np.asarray(to_dense(ballots), dtype=bool)
+    types, index, inverse = np.unique(ballots, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse, weights=weights, minlength=len(types)).astype(int)
+    result = (types,)
+    if return_index:
+        result += (index,)
+    if return_inverse:
+        result += (inverse,)
+    return result + (counts,)
+
+
+class WeightedProfile:
+    """
+    An approval profile stored as its distinct ballots and the number of voters casting each
+    of them. Profiles with many identical ballots are much smaller in this form, and the rules
+    work on the ballots weighted by their counts instead of on every voter.
+
+    Parameters
+    ----------
+    profile : np.ndarray, list or scipy.sparse matrix
+        The ballots. If ``counts`` is None, one row per voter, and identical rows are merged.
+    counts : int list
+        The number of voters casting each row of ``profile``. If None, every row is one voter.
+
+    Attributes
+    ----------
+    ballots : np.ndarray
+        The ballots, one boolean row per ballot
+    counts : np.ndarray
+        The number of voters casting each ballot
+
+    Examples
+    --------
+    >>> profile = WeightedProfile([[1, 1, 0]]*5 + [[0, 1, 1]]*3)
+    >>> profile.ballots.astype(int)
+    array([[0, 1, 1],
+           [1, 1, 0]])
+    >>> profile.counts
+    array([3, 5])
+    >>> profile.shape
+    (8, 3)
+    """
+
+    def __init__(self, profile, counts=None):
+        if counts is None:
+            ballots, counts = voter_types(profile)
+        else:
+            counts = np.asarray(counts, dtype=int).reshape(-1)
+            ballots = np.atleast_2d(np.asarray(to_dense(profile), dtype=bool))
+            if len(ballots) != len(counts):
+                raise ValueError("There should be one count per ballot")
+            if np.any(counts < 0):
+                raise ValueError("The counts of ballots should be non-negative")
+            ballots, counts = ballots[counts > 0], counts[counts > 0]
+        self.ballots = ballots
+        self.counts = counts
+
+    @property
+    def shape(self):
+        """
+        The number of voters and the number of candidates.
+        """
+        return int(self.counts.sum()), self.ballots.shape[1]
+
+    def toarray(self):
+        """
+        Expand the profile to one row per voter.
+
+        Returns
+        -------
+        np.ndarray
+            The approval profile, with the voters of each ballot in consecutive rows
+
+        """
+        return np.repeat(self.ballots, self.counts, axis=0)
+
+
+def stack_voters(profile, ballots):
+    """
+    This function adds voters at the end of a profile. The result is a weighted profile if
+    one of the profiles is weighted, sparse if ``profile`` is sparse, and dense otherwise.
+
+    Parameters
+    ----------
+    profile : np.ndarray, list, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+    ballots : np.ndarray, list, scipy.sparse matrix or WeightedProfile
+        The ballots of the new voters
+
+    Returns
+    -------
+    np.ndarray, scipy.sparse.csc_matrix or WeightedProfile
+        The profile with the new voters
+
+    Examples
+    --------
+    >>> stack_voters([[1, 0], [0, 1]], [[1, 1]])
+    array([[1, 0],
+           [0, 1],
+           [1, 1]])
+    >>> stack_voters(WeightedProfile([[1, 0], [1, 0]]), [[1, 0]]).counts
+    array([2, 1])
+    """
+    profile, ballots = as_profile(profile), as_profile(ballots)
+    if isinstance(profile, WeightedProfile) or isinstance(ballots, WeightedProfile):
+        (old, old_counts), (new, new_counts) = weighted_ballots(profile), weighted_ballots(ballots)
+        return WeightedProfile(np.vstack([to_dense(old), to_dense(new)]),
+                               np.concatenate([old_counts, new_counts]))
+    if is_sparse(profile):
+        return as_profile(sparse.vstack([profile, sparse.csc_matrix(ballots)]))
+    return np.vstack([profile, to_dense(ballots)])
+
+
+def drop_voters(profile, voters):
+    """
+    This function removes voters from a profile. The voters of a weighted profile are
+    numbered as in its expanded form (see :meth:`WeightedProfile.toarray`).
+
+    Parameters
+    ----------
+    profile : np.ndarray, list, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+    voters : int list
+        The indices of the voters to remove
+
+    Returns
+    -------
+    np.ndarray, scipy.sparse.csc_matrix or WeightedProfile
+        The profile without these voters
+    np.ndarray, scipy.sparse.csc_matrix or WeightedProfile
+        The ballots of the removed voters
+
+    Examples
+    --------
+    >>> kept, removed = drop_voters([[1, 0], [0, 1], [1, 1]], [1])
+    >>> kept
+    array([[1, 0],
+           [1, 1]])
+    >>> removed
+    array([[0, 1]])
+    >>> kept, removed = drop_voters(WeightedProfile([[1, 1, 0]]*2 + [[0, 1, 1]]*3), [0, 4])
+    >>> kept.counts, removed.counts
+    (array([2, 1]), array([1, 1]))
+    """
+    profile = as_profile(profile)
+    removed = np.zeros(profile.shape[0], dtype=bool)
+    removed[voters] = True
+    if isinstance(profile, WeightedProfile):
+        rows = np.repeat(np.arange(len(profile.counts)), profile.counts)
+        counts = np.bincount(rows[removed], minlength=len(profile.counts))
+        return (WeightedProfile(profile.ballots, profile.counts - counts),
+                WeightedProfile(profile.ballots, counts))
+    if is_sparse(profile):
+        rows = profile.tocsr()
+        return as_profile(rows[~removed]), as_profile(rows[removed])
+    return profile[~removed], profile[removed]
+
+
+def profile_hash(profile):
+    """
+    This function computes a hash of the content of a profile. Equal profiles have the same
+    hash, whatever their representation (list, numpy array or sparse matrix). A weighted
+    profile is hashed by its ballots and counts.
+
+    Parameters
+    ----------
+    profile : np.ndarray, list, scipy.sparse matrix or WeightedProfile
+        The approval profile of voters
+
+    Returns
+    -------
+    str
+        The hexadecimal hash of the profile
+
+    Examples
+    --------
+    >>> profile_hash([[1, 0], [0, 1]]) == profile_hash(np.array([[True, False], [False, True]]))
+    True
+    >>> profile_hash([[1, 0], [0, 1]]) == profile_hash([[0, 1], [1, 0]])
+    False
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(profile, WeightedProfile):
+        digest.update(b'weighted')
+        ballots, counts = profile.ballots, profile.counts
+        digest.update(np.asarray(counts, dtype=np.int64).tobytes())
+    else:
+        ballots = profile
+    if is_sparse(ballots):
+        ballots = as_profile(ballots)
+        digest.update(repr(ballots.shape).encode())
+        digest.update(np.asarray(ballots.indptr, dtype=np.int64).tobytes())
+        digest.update(np.asarray(ballots.indices, dtype=np.int64).tobytes())
+        return digest.hexdigest()
+    # a dense profile is hashed as its CSC representation, so that both have the same hash
+    ballots = np.asarray(ballots, dtype=bool)
+    candidates, voters = np.nonzero(ballots.T)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(candidates, minlength=ballots.shape[1]))])
+    digest.update(repr(ballots.shape).encode())
+    digest.update(indptr.astype(np.int64).tobytes())
+    digest.update(voters.astype(np.int64).tobytes())
+    return digest.hexdigest()
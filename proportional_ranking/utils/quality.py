@@ -1,6 +1,8 @@
 import numpy as np
 import math
-from itertools import combinations
+from itertools import chain, combinations, islice
+from proportional_ranking.utils.cache import DeleteCacheMixin, cached_property
+from proportional_ranking.utils.profiles import as_profile, to_dense, voter_types, weighted_ballots
 
 
 def avg_satisfaction(profile, voters, committee):
@@ -58,47 +60,117 @@ def justified_demand(profile, voters, k):
     return min(proportion, max_consensus), proportion <= max_consensus
 
 
-def justify(profile, ranking):
+def _multiplicities(counts, size):
+    """
+    Generate every way to pick ``size`` voters among voter types with ``counts`` voters, as
+    the number of voters picked in each type.
+    """
+    if len(counts) == 0:
+        if size == 0:
+            yield ()
+        return
+    rest = sum(counts[1:])
+    for x in range(max(0, size - rest), min(counts[0], size) + 1):
+        for tail in _multiplicities(counts[1:], size - x):
+            yield (x,) + tail
+
+
+def _multiplicity_batches(counts, size, batch_size):
+    """
+    Generate every group of ``size`` voters, up to the order of voters with the same ballot,
+    by batches of at most ``batch_size`` groups, so that only one batch is in memory at a time.
+
+    Parameters
+    ----------
+    counts : int list
+        The number of voters of each type
+    size : int
+        The size of the groups
+    batch_size : int
+        The maximal number of groups per batch
+
+    Yields
+    ------
+    np.ndarray
+        A 2-D array of shape (batch, number of types). Each row contains the number of voters
+        of each type in one group.
+
+    """
+    counts = [int(c) for c in counts]
+    groups = _multiplicities(counts, size)
+    while True:
+        batch = np.fromiter(chain.from_iterable(islice(groups, batch_size)), dtype=int)
+        if len(batch) == 0:
+            return
+        yield batch.reshape(-1, len(counts))
+
+
+def justify(profile, ranking, batch_size=4096, prefix=None):
     """
     This function compute if a ranking is justified ranking.
 
+    Voters with the same ballot are interchangeable, so a group of voters is given by the
+    number of voters of each ballot in the group. The groups are processed by batches (see
+    :func:`_multiplicity_batches`), and the function stops at the first group of voters whose
+    justified demand is not fulfilled.
+    If the quality of the ranking is already stored in ``prefix``, the ranking is justified
+    if and only if its quality is at least 1 and no subset is enumerated.
+
     Parameters
     ----------
-    profile : np.ndarray
+    profile : np.ndarray or WeightedProfile
         The approval profile of voters
     ranking : int list
         The ranking of candidates
+    batch_size : int
+        The number of groups of voters processed at once
+    prefix : PrefixSatisfaction
+        The satisfaction of voters with the prefixes of the ranking. If None, it is computed.
 
     Returns
     -------
     bool
         True if and only if the ranking is justified.
 
+    Examples
+    --------
+    >>> profile = np.array([[1, 1, 0, 0], [1, 1, 0, 0], [0, 0, 1, 1], [0, 0, 1, 0]])
+    >>> justify(profile, [0, 2, 1, 3])
+    True
+    >>> justify(profile, [0, 1, 2, 3])
+    False
     """
-    n, m = profile.shape
-    min_v = np.infty
+    if prefix is None:
+        prefix = PrefixSatisfaction(profile, ranking)
+    if prefix.quality is not None:
+        return prefix.quality >= 1
+
+    types, index, counts = voter_types(prefix.profile, return_index=True)
+    satisfaction = prefix.counts[index]
+    disapprovals = (~types).astype(int)
+    n, m = prefix.profile.shape
     for k in range(1, m + 1):
         j = 1
         prop = math.ceil(n / k)
         while prop <= n:
-            list_subset = list(combinations(np.arange(n), prop))
-            for subset in list_subset:
-                jd, needed = justified_demand(profile, list(subset), k)
-                if jd > 0 and needed:
-                    af = avg_satisfaction(profile, list(subset), ranking[:k])
-                    x = af / jd
-                    if x < min_v:
-                        min_v = x
-                        if min_v < 1:
-                            return False
+            proportion = int(prop * k / n)
+            # No group can commonly approve more than m candidates
+            if proportion <= m:
+                for groups in _multiplicity_batches(counts, prop, batch_size):
+                    consensus = ((groups > 0).dot(disapprovals) == 0).sum(axis=1)
+                    af = groups.dot(satisfaction[:, k]) / prop
+                    if np.any((proportion <= consensus) & (af / proportion < 1)):
+                        return False
             j += 1
             prop = math.ceil(j * n / k)
     return True
 
 
-def quality(profile, ranking):
+def quality_brute_force(profile, ranking):
     """
-    This function compute the quality of a ranking for a given profile.
+    This function compute the quality of a ranking for a given profile by enumerating
+    every subset of voters. It is exponential in the number of voters and is only
+    kept as a reference for :func:`quality`.
 
     Parameters
     ----------
@@ -109,12 +181,13 @@ def quality(profile, ranking):
 
     Returns
     -------
-    bool
-        True if and only if the ranking is justified.
+    float
+        The quality of the ranking.
 
     """
+    profile = to_dense(profile)
     n, m = profile.shape
-    min_v = np.infty
+    min_v = np.inf
     for k in range(1, m + 1):
         prop = math.ceil(n / k)
         for j in range(prop, n + 1):
@@ -127,3 +200,470 @@ def quality(profile, ranking):
                     if x < min_v:
                         min_v = x
     return min_v
+
+
+def _clique_masks(approvals):
+    """
+    Encode rows of approvals as bitmasks (bit j is set if candidate j is approved). The masks
+    are stored as ``np.uint64`` when possible, and as python integers otherwise.
+    """
+    m = approvals.shape[1]
+    if m <= 64:
+        bits = np.left_shift(np.uint64(1), np.arange(m, dtype=np.uint64))
+        return np.bitwise_or.reduce(np.where(approvals, bits, np.uint64(0)), axis=1)
+    masks = np.empty(len(approvals), dtype=object)
+    masks[:] = [sum(1 << int(j) for j in np.flatnonzero(row)) for row in approvals]
+    return masks
+
+
+class CohesiveGroups:
+    """
+    The cohesive groups of an approval profile, used to compute the quality of rankings in
+    polynomial time in the number of voters.
+
+    Voters with the same ballot are merged into a single voter type. A clique is a non-empty
+    set of candidates which is exactly the set of common approvals of some group of voters,
+    and its members are the voter types approving every candidate of the clique. Every group
+    of voters with a justified demand is contained in the members of the clique made of its
+    common approvals, and among the subsets of a given size of these members, the least
+    satisfied voters give the smallest ratio. Thus it is enough to look at the least
+    satisfied voters of each clique, and only for the sizes ``ceil(l * n / k)``.
+
+    Parameters
+    ----------
+    profile: np.ndarray or WeightedProfile
+        The approval profile of voters
+
+    Attributes
+    ----------
+    n_voters: int
+        The number of voters
+    types: np.ndarray
+        The distinct ballots of the profile, one row per voter type
+    counts: np.ndarray
+        The number of voters of each type
+    representatives: np.ndarray
+        ``representatives[t]`` is the first voter of type t, or its first ballot for a
+        weighted profile
+    inverse: np.ndarray
+        ``inverse[i]`` is the type of voter i, or of ballot i for a weighted profile
+    cliques: np.ndarray
+        The cliques, one boolean row per clique
+    members: np.ndarray
+        ``members[c, t]`` is True if voters of type t approve every candidate of clique c
+    supports: np.ndarray
+        The number of voters approving every candidate of each clique
+
+    Examples
+    --------
+    >>> groups = CohesiveGroups([[1, 1, 0], [1, 1, 0], [0, 1, 1]])
+    >>> groups.cliques.astype(int)
+    array([[0, 1, 0],
+           [1, 1, 0],
+           [0, 1, 1]])
+    >>> groups.supports
+    array([3, 2, 1])
+    """
+
+    _chunk_size = 1024
+
+    def __init__(self, profile):
+        n, m = as_profile(profile).shape
+        self.n_voters = n
+        self.types, self.representatives, self.inverse, self.counts = voter_types(
+            profile, return_index=True, return_inverse=True)
+
+        # A group of voters with a justified demand has at least ceil(n / m) voters
+        min_support = -(-n // m) if m > 0 else n + 1
+        masks = _clique_masks(self.types)
+        closed = np.unique(masks[masks != 0])
+        frontier = closed
+
+        # Closed sets of common approvals are the intersections of ballots
+        while len(frontier) > 0:
+            new_cliques = []
+            for start in range(0, len(frontier), self._chunk_size):
+                inter = np.unique(frontier[start:start + self._chunk_size, None] & masks[None, :])
+                new_cliques.append(inter[inter != 0])
+            frontier = np.setdiff1d(np.concatenate(new_cliques), closed)
+            closed = np.union1d(closed, frontier)
+
+        # Only the cliques with enough members can have a binding justified demand
+        members = np.zeros((len(closed), len(masks)), dtype=bool)
+        for start in range(0, len(closed), self._chunk_size):
+            chunk = closed[start:start + self._chunk_size, None]
+            members[start:start + self._chunk_size] = (chunk & masks[None, :]) == chunk
+        supports = members.dot(self.counts)
+        keep = supports >= min_support
+
+        self.cliques = np.array([[(int(c) >> j) & 1 for j in range(m)] for c in closed[keep]],
+                                dtype=bool).reshape(-1, m)
+        self.members = members[keep]
+        self.supports = supports[keep]
+        self.sizes = self.cliques.sum(axis=1)
+        self._weighted_members = self.members * self.counts.astype(float)
+
+    def min_ratio(self, satisfaction, k):
+        """
+        Compute the minimal ratio between the average satisfaction and the justified demand
+        over every group of voters, for the first k positions of a ranking.
+
+        Parameters
+        ----------
+        satisfaction: np.ndarray
+            ``satisfaction[t]`` is the number of candidates approved by voters of type t among
+            the first k candidates of the ranking
+        k: int
+            The size of the subranking
+
+        Returns
+        -------
+        float
+            The minimal ratio, or ``np.inf`` if no group has a justified demand.
+
+        """
+        n = self.n_voters
+        active = self.supports >= -(-n // k)
+        if not active.any():
+            return np.inf
+        sizes = self.sizes[active]
+        supports = self.supports[active]
+
+        # Number of members of each clique approving each number of candidates
+        levels = np.arange(k + 1)
+        hist = self._weighted_members[active].dot(satisfaction[:, None] == levels)
+        cum_counts = np.cumsum(hist.astype(int), axis=1)
+        cum_sat = np.cumsum(hist.astype(int) * levels, axis=1)
+
+        # The groups of size ceil(l * n / k) made of the least satisfied members of each clique
+        group_sizes = -(-np.arange(1, sizes.max() + 1) * n // k)
+        proportions = group_sizes * k // n
+        valid = (group_sizes <= supports[:, None]) & (proportions <= sizes[:, None])
+        if not valid.any():
+            return np.inf
+        last = np.minimum((cum_counts[:, None, :] < group_sizes[:, None]).sum(axis=2), k)
+        total = (np.take_along_axis(cum_sat, last, axis=1)
+                 - (np.take_along_axis(cum_counts, last, axis=1) - group_sizes) * last)
+        return (total / group_sizes / proportions)[valid].min()
+
+
+class PrefixSatisfaction(DeleteCacheMixin):
+    """
+    The satisfaction of every voter with every prefix of a ranking. It is computed in one
+    pass over the ranking and can be shared between :func:`quality` and :func:`justify`.
+    For a weighted profile, it is computed once per ballot.
+
+    Parameters
+    ----------
+    profile: np.ndarray or WeightedProfile
+        The approval profile of voters
+    ranking: int list
+        The ranking of candidates
+
+    Attributes
+    ----------
+    profile: np.ndarray or WeightedProfile
+        The approval profile of voters
+    ranking: np.ndarray
+        The ranking of candidates
+    ballots: np.ndarray
+        The ballots of the profile (see
+        :func:`~proportional_ranking.utils.profiles.weighted_ballots`)
+    weights: np.ndarray
+        The number of voters of each ballot
+    counts: np.ndarray
+        ``counts[i, k]`` is the number of candidates approved by the voters of ballot i among
+        the first k candidates of the ranking
+    quality: float
+        The quality of the ranking, once it has been computed by :func:`quality`
+
+    Examples
+    --------
+    >>> prefix = PrefixSatisfaction([[1, 1, 0, 0], [1, 1, 0, 0], [0, 0, 1, 1]], [0, 2, 1, 3])
+    >>> prefix.counts
+    array([[0, 1, 1, 2, 2],
+           [0, 1, 1, 2, 2],
+           [0, 0, 1, 1, 2]])
+    >>> prefix.group_satisfaction([1, 2], 3)
+    3
+    """
+
+    def __init__(self, profile, ranking):
+        self.profile = as_profile(profile)
+        self.ranking = np.asarray(ranking, dtype=int)
+        ballots, self.weights = weighted_ballots(self.profile)
+        self.ballots = np.asarray(to_dense(ballots), dtype=bool)
+        n = len(self.ballots)
+        self.counts = np.zeros((n, len(self.ranking) + 1), dtype=int)
+        running = np.zeros(n, dtype=int)
+        for k, candidate in enumerate(self.ranking, 1):
+            running += self.ballots[:, candidate]
+            self.counts[:, k] = running
+        self.quality = None
+
+    def group_satisfaction(self, voters, k):
+        """
+        Compute the total satisfaction of groups of voters with the first k candidates.
+
+        Parameters
+        ----------
+        voters: np.ndarray
+            The voters of a group, or a 2-D array with one group per row. For a weighted
+            profile, the voters are given by their ballots.
+        k: int
+            The size of the subranking
+
+        Returns
+        -------
+        int or np.ndarray
+            The number of approved candidates among the first k, summed over each group
+
+        """
+        return self.counts[voters, k].sum(axis=-1)
+
+    @cached_property
+    def groups(self):
+        """
+        The cohesive groups of the profile.
+
+        Returns
+        -------
+        CohesiveGroups
+            The cohesive groups of the profile
+
+        """
+        return CohesiveGroups(self.profile)
+
+
+def quality(profile, ranking, prefix=None):
+    """
+    This function compute the quality of a ranking for a given profile, i.e. the minimal
+    ratio between the average satisfaction of a group of voters and its justified demand.
+
+    The voters are grouped by ballots and by the cliques of candidates they commonly approve
+    (see :class:`CohesiveGroups`), which gives the same value as
+    :func:`quality_brute_force` in polynomial time in the number of voters.
+
+    Parameters
+    ----------
+    profile : np.ndarray or WeightedProfile
+        The approval profile of voters
+    ranking : int list
+        The ranking of candidates
+    prefix : PrefixSatisfaction
+        The satisfaction of voters with the prefixes of the ranking. If None, it is computed.
+
+    Returns
+    -------
+    float
+        The quality of the ranking.
+
+    Examples
+    --------
+    >>> profile = np.array([[1, 1, 0, 0], [1, 1, 0, 0], [0, 0, 1, 1], [0, 0, 1, 0]])
+    >>> quality(profile, [0, 2, 1, 3])
+    1.0
+    >>> quality(profile, [0, 1, 2, 3])
+    0.0
+    """
+    if prefix is None:
+        prefix = PrefixSatisfaction(profile, ranking)
+    if prefix.quality is not None:
+        return prefix.quality
+
+    groups = prefix.groups
+    satisfaction = prefix.counts[groups.representatives]
+    min_v = np.inf
+    for k in range(1, len(prefix.ranking) + 1):
+        x = groups.min_ratio(satisfaction[:, k], k)
+        if x < min_v:
+            min_v = x
+    prefix.quality = min_v
+    return min_v
+
+
+def _clique_ratio(satisfaction, weights, size, n):
+    """
+    Compute the minimal ratio between the average satisfaction and the justified demand of the
+    least satisfied members of a clique, over every prefix of the ranking.
+
+    Parameters
+    ----------
+    satisfaction : np.ndarray
+        ``satisfaction[t, k]`` is the number of candidates approved by the members of type t
+        among the first k candidates of the ranking
+    weights : np.ndarray
+        The number of voters of each member type
+    size : int
+        The number of candidates of the clique
+    n : int
+        The number of voters
+
+    Returns
+    -------
+    float
+        The minimal ratio, or ``np.inf`` if no group of members has a justified demand
+    int
+        The size of the prefix of the minimal ratio
+    int
+        The size of the group of the minimal ratio
+
+    """
+    support = weights.sum()
+    width = satisfaction.shape[1]
+    # hist[k, s] is the number of members approving s candidates among the first k
+    index = (satisfaction + np.arange(width) * width).ravel()
+    hist = np.bincount(index, weights=np.repeat(weights, width), minlength=width * width)
+    hist = hist.reshape(width, width)
+    cum_counts = np.cumsum(hist, axis=1)
+    cum_sat = np.cumsum(hist * np.arange(width), axis=1)
+    # the groups of j * n / k voters for every prefix size k and every j up to the size
+    k, j = np.divmod(np.arange(size, width * size), size)
+    group_sizes = -(-(j + 1) * n // k)
+    proportions = group_sizes * k // n
+    valid = (group_sizes <= support) & (proportions <= size)
+    if not valid.any():
+        return np.inf, None, None
+    k, group_sizes, proportions = k[valid], group_sizes[valid], proportions[valid]
+    # the least satisfied voters of a group approve at most ``last`` candidates
+    last = np.minimum((cum_counts[k] < group_sizes[:, None]).sum(axis=1), k)
+    total = cum_sat[k, last] - (cum_counts[k, last] - group_sizes) * last
+    ratios = total / group_sizes / proportions
+    i = np.argmin(ratios)
+    return ratios[i], int(k[i]), int(group_sizes[i])
+
+
+def _weighted_choice(cum_weights, rng, size=None):
+    """
+    Draw indices with probabilities proportional to weights given by their cumulative sums.
+    """
+    return np.searchsorted(cum_weights, rng.random(size) * cum_weights[-1], side='right')
+
+
+def _candidate_cliques(types, counts, min_support, budget, rng, patience=64):
+    """
+    Generate at most ``budget`` distinct sets of candidates commonly approved by at least
+    ``min_support`` voters, with the mask of the voter types approving them: the sets grown
+    greedily from every candidate by adding the candidate most approved by their supporters,
+    the ballots of the most frequent voter types, and then random intersections of two ballots
+    and random chains. The random search stops after ``patience`` sets in a row that were
+    already generated.
+    """
+    n_types, m = types.shape
+    seen = set()
+
+    def extend_clique(candidate, randomized):
+        clique = np.zeros(m, dtype=bool)
+        members = np.ones(n_types, dtype=bool)
+        while True:
+            clique[candidate] = True
+            members &= types[:, candidate]
+            if counts[members].sum() < min_support:
+                return
+            yield clique.copy(), members.copy()
+            support = counts[members].dot(types[members]).astype(float)
+            support[clique | (support < min_support)] = 0
+            if not support.any():
+                return
+            if randomized:
+                candidate = _weighted_choice(np.cumsum(support), rng)
+            else:
+                candidate = np.argmax(support)
+
+    def ballots():
+        for i in np.argsort(-counts, kind='stable')[:budget]:
+            yield types[i], types[:, types[i]].all(axis=1)
+
+    singles = np.flatnonzero(counts.dot(types) >= min_support)
+    cum_counts = np.cumsum(counts)
+
+    def random_cliques():
+        while len(singles) > 0:
+            if rng.random() < 0.5:
+                yield from extend_clique(rng.choice(singles), True)
+            else:
+                first, second = _weighted_choice(cum_counts, rng, 2)
+                clique = types[first] & types[second]
+                yield clique, types[:, clique].all(axis=1)
+
+    sources = [extend_clique(c, False) for c in singles] + [ballots(), random_cliques()]
+    repeats = 0
+    for source in sources:
+        for clique, members in source:
+            key = clique.tobytes()
+            if key in seen or not clique.any() or counts[members].sum() < min_support:
+                repeats += 1
+                # only the random search can go on forever
+                if repeats >= patience and source is sources[-1]:
+                    return
+                continue
+            seen.add(key)
+            repeats = 0
+            yield clique, members
+            if len(seen) >= budget:
+                return
+
+
+def quality_estimate(profile, ranking, budget=256, seed=None, prefix=None):
+    """
+    This function estimates the quality of a ranking by looking only at some cohesive groups
+    of voters, for electorates too large for :func:`quality`.
+
+    Groups are built from sets of candidates commonly approved by enough voters, found by
+    greedy and randomized searches (see :class:`CohesiveGroups` for the exact enumeration).
+    For each set, the least satisfied voters approving it give the smallest ratio, as in
+    :func:`quality`. Every ratio found is reached by a group of voters, so the estimate is an
+    upper bound of the quality, which is exact when the search finds the worst group.
+
+    Parameters
+    ----------
+    profile : np.ndarray or WeightedProfile
+        The approval profile of voters
+    ranking : int list
+        The ranking of candidates
+    budget : int
+        The maximal number of sets of candidates looked at
+    seed : int or np.random.Generator
+        The seed of the random search
+    prefix : PrefixSatisfaction
+        The satisfaction of voters with the prefixes of the ranking. If None, it is computed.
+        If its quality is already known, it is returned without a search.
+
+    Returns
+    -------
+    float
+        An upper bound of the quality of the ranking, or ``np.inf`` if no group with a
+        justified demand was found
+    tuple
+        The witnessing group, as the candidates it commonly approves, the size k of the prefix
+        of the ranking and the number of voters of the group, which are the least satisfied
+        voters approving these candidates. None if no group was found or if the quality was
+        already known.
+
+    Examples
+    --------
+    >>> profile = np.array([[1, 1, 0, 0], [1, 1, 0, 0], [0, 0, 1, 1], [0, 0, 1, 0]])
+    >>> quality_estimate(profile, [0, 2, 1, 3], seed=0)[0]
+    1.0
+    >>> estimate, (clique, k, size) = quality_estimate(profile, [0, 1, 2, 3], seed=0)
+    >>> estimate, clique, k, size
+    (0.0, array([2]), 2, 2)
+    """
+    if prefix is None:
+        prefix = PrefixSatisfaction(profile, ranking)
+    if prefix.quality is not None:
+        return prefix.quality, None
+    rng = np.random.default_rng(seed)
+    types, index, counts = voter_types(prefix.profile, return_index=True)
+    satisfaction = prefix.counts[index]
+    n, m = prefix.profile.shape
+    if m == 0 or n == 0:
+        return np.inf, None
+
+    best, witness = np.inf, None
+    min_support = -(-n // m)
+    for clique, members in _candidate_cliques(types, counts, min_support, budget, rng):
+        ratio, k, size = _clique_ratio(satisfaction[members], counts[members], clique.sum(), n)
+        if ratio < best:
+            best, witness = ratio, (np.flatnonzero(clique), k, size)
+    return best, witness
@@ -0,0 +1,162 @@
+import numpy as np
+
+
+def chain_argmax(values, tolerance=0.0001, best=-np.inf, index=-1):
+    """
+    This function finds the best candidate the way the sequential rules do: the values are
+    scanned in order, and a value replaces the current best one only if it is larger by more
+    than ``tolerance``. Thus ties are broken in favor of the lowest index.
+
+    Only the values that replace the current best one are visited, each jump being a
+    vectorized search over the rest of the values.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The value of each candidate
+    tolerance : float
+        The minimal difference for a value to replace the current best one
+    best : float
+        The initial best value
+    index : int
+        The index returned if no value replaces the initial best value
+
+    Returns
+    -------
+    int
+        The index of the best candidate
+
+    Examples
+    --------
+    >>> chain_argmax([1.0, 1.00005, 1.0002, 1.00025])
+    2
+    >>> chain_argmax([0, 0, 0], best=0)
+    -1
+    """
+    values = np.asarray(values)
+    start = 0
+    while True:
+        with np.errstate(invalid='ignore'):
+            better = np.flatnonzero(values[start:] - best > tolerance)
+        if len(better) == 0:
+            return index
+        index = start + int(better[0])
+        best = values[index]
+        start = index + 1
+
+
+def chain_argmax_rows(values, tolerance=0.0001, best=-np.inf, index=-1):
+    """
+    This function applies :func:`chain_argmax` to every row of a matrix at once. Every jump
+    is done for all the rows that still have a better value, with one vectorized search.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        A (B, m) matrix, with the value of each candidate in each row
+    tolerance : float
+        The minimal difference for a value to replace the current best one
+    best : float or np.ndarray
+        The initial best value, for all rows or for each row
+    index : int or np.ndarray
+        The index returned if no value replaces the initial best value, for all rows or for
+        each row
+
+    Returns
+    -------
+    np.ndarray
+        The index of the best candidate of each row
+
+    Examples
+    --------
+    >>> chain_argmax_rows([[1.0, 1.00005, 1.0002, 1.00025], [0, 0, 0, 0]])
+    array([2, 0])
+    >>> chain_argmax_rows([[0, 1], [0, 0]], best=[0, 0], index=[0, 0])
+    array([1, 0])
+    """
+    values = np.asarray(values, dtype=float)
+    rows, m = values.shape
+    best = np.array(np.broadcast_to(best, rows), dtype=float)
+    index = np.array(np.broadcast_to(index, rows), dtype=int)
+    start = np.zeros(rows, dtype=int)
+    active = np.arange(rows)
+    columns = np.arange(m)
+    while len(active) > 0:
+        with np.errstate(invalid='ignore'):
+            better = values[active] - best[active, None] > tolerance
+        better &= columns >= start[active, None]
+        found = better.any(axis=1)
+        active = active[found]
+        index[active] = better[found].argmax(axis=1)
+        best[active] = values[active, index[active]]
+        start[active] = index[active] + 1
+    return index
+
+
+def first_argmax(values, tolerance=1e-9):
+    """
+    This function finds the first value that is equal to the maximum, up to a relative
+    tolerance, along the last axis. Values that only differ by rounding errors are thus ties,
+    broken in favor of the lowest index.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The value of each candidate, or a matrix with the values of each row
+    tolerance : float
+        The relative tolerance. The scale of the values is at least 1.
+
+    Returns
+    -------
+    int or np.ndarray
+        The index of the best candidate, or of the best candidate of each row
+
+    Examples
+    --------
+    >>> int(first_argmax([1/12 + 1/6 + 1/3, 1/3 + 1/6 + 1/12]))
+    0
+    >>> first_argmax([[0, 2, 2], [1, 0, 1 + 1e-6]])
+    array([1, 2])
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        best = values.max()
+        return np.argmax(values >= best - tolerance * max(1, abs(best)))
+    best = values.max(axis=-1, keepdims=True)
+    close = values >= best - tolerance * np.maximum(1, np.abs(best))
+    return np.argmax(close, axis=-1)
+
+
+def last_argmin(values, tolerance=1e-9):
+    """
+    This function finds the last value that is equal to the minimum, up to a relative
+    tolerance, along the last axis. It is the counterpart of :func:`first_argmax` for the rules
+    that remove the worst candidate, and break ties in favor of the highest index.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The value of each candidate, or a matrix with the values of each row
+    tolerance : float
+        The relative tolerance. The scale of the values is at least 1.
+
+    Returns
+    -------
+    int or np.ndarray
+        The index of the worst candidate, or of the worst candidate of each row
+
+    Examples
+    --------
+    >>> int(last_argmin([1/12 + 1/6 + 1/3, 1/3 + 1/6 + 1/12, 1]))
+    1
+    >>> last_argmin([[0, 2, 0], [1, 0, np.inf]])
+    array([2, 1])
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        worst = values.min()
+        close = values <= worst + tolerance * max(1, abs(worst))
+        return len(close) - 1 - np.argmax(close[::-1])
+    worst = values.min(axis=-1, keepdims=True)
+    close = values <= worst + tolerance * np.maximum(1, np.abs(worst))
+    return close.shape[-1] - 1 - np.argmax(close[..., ::-1], axis=-1)
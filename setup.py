@@ -32,6 +32,7 @@ setup(
     ],
     description="Python code for the proportional ranking, ALGO Team TUB",
     install_requires=requirements,
+    extras_require={'sparse': ['scipy']},
     license="GNU General Public License v3",
     long_description=readme + '\n\n' + history,
     long_description_content_type='text/x-rst',
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+"""Tests for the caches of `proportional_ranking`."""
+
+import pickle
+
+import numpy as np
+
+from proportional_ranking.rules import SeqPAV, seqX, Phragmen, SeqScorePAV, MaximizeQuality
+from proportional_ranking.utils.cache import DiskCache
+
+
+def test_rankings_are_memoized_per_profile():
+    profile = [[1, 1, 0, 0], [0, 1, 1, 0], [0, 0, 1, 1], [1, 0, 0, 1]]
+    rule = MaximizeQuality().set_profile(profile)
+    ranking = rule.ranking()
+    assert rule.ranking() is ranking
+    assert rule.quality >= 1 and rule.justifiable
+    assert rule.cache_info()['ranking'] == {'hits': 2, 'misses': 1}
+
+    rule.set_profile(profile[:3])
+    assert rule.ranking() is not ranking
+    assert rule.cache_info()['ranking'] == {'hits': 2, 'misses': 2}
+
+    rule = SeqScorePAV('b').set_profile(profile)
+    ranking = rule.ranking()
+    rule.set_scorevector([2, 1])
+    assert rule.ranking() is not ranking
+    assert rule.cache_info()['ranking']['misses'] == 2
+
+
+def test_disk_cache_reuses_values(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"))
+    profile = np.random.default_rng(0).random((20, 6)) > 0.5
+    profile[:, 0] = True
+    for rule in [SeqPAV(), seqX(backend='float'), Phragmen()]:
+        expected = rule.set_profile(profile)
+        expected = (expected.ranking(), expected.quality, expected.justifiable)
+        cached = rule.use_disk_cache(cache).set_profile(profile)
+        assert (cached.ranking(), cached.quality, cached.justifiable) == expected
+        assert (cached.ranking(), cached.quality, cached.justifiable) == expected
+        cached.use_disk_cache(None)
+    assert len(cache) == 9
+
+    # the key depends on the parameters of the rule
+    rule = SeqPAV(alpha=1).use_disk_cache(cache).set_profile(profile)
+    assert rule.cache_key('ranking') != SeqPAV().set_profile(profile).cache_key('ranking')
+    rule.ranking()
+    assert len(cache) == 10
+
+
+def test_disk_cache_eviction_and_pickling(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_entries=3)
+    for i in range(5):
+        cache[str(i)] = i
+        assert cache['0'] == 0
+    assert len(cache) == 3
+    assert '0' in cache and '4' in cache and '1' not in cache
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy['4'] == 4
+    copy.clear()
+    assert len(cache) == 0
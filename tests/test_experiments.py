@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""Tests for `proportional_ranking.experiments`."""
+
+import numpy as np
+import pytest
+
+from proportional_ranking.experiments import (compare_rules, generate_profiles, profile_stream,
+                                              ResultSink, load_records)
+from proportional_ranking.rules import AV, SeqPAV
+
+
+def test_compare_rules_does_not_depend_on_workers():
+    rules = [AV(), SeqPAV()]
+    avg, success = compare_rules(6, 4, rules, iterations=30, chunk_size=7, seed=2)
+    avg_pool, success_pool = compare_rules(6, 4, rules, iterations=30, chunk_size=7, seed=2,
+                                           n_jobs=2)
+    assert np.array_equal(avg, avg_pool)
+    assert np.array_equal(success, success_pool)
+    assert np.all(avg[-1] >= avg[:-1])
+    assert np.all((success >= 0) & (success <= 1))
+
+
+@pytest.mark.parametrize("culture, params", [('impartial', {}), ('impartial', {'p': 0.1}),
+                                             ('resampling', {'p': 0.3, 'phi': 0.4}),
+                                             ('euclidean', {'radius': 0.3, 'dim': 2}),
+                                             ('disjoint', {'groups': 2, 'p': 0.8})])
+def test_generated_profiles_are_valid_and_reproducible(culture, params):
+    profiles = generate_profiles(200, 8, 4, culture, seed=3, **params)
+    assert profiles.shape == (200, 8, 4)
+    assert profiles.any(axis=2).all() and profiles.any(axis=1).all()
+    assert np.array_equal(profiles, generate_profiles(200, 8, 4, culture, seed=3, **params))
+    stream = list(profile_stream(30, 8, 4, culture, seed=3, batch_size=7, **params))
+    assert len(stream) == 30
+    assert np.array_equal(stream[:7], generate_profiles(7, 8, 4, culture, seed=3, **params))
+
+
+def test_compare_rules_reproducible_from_seed_sequence():
+    rules = [AV(), SeqPAV()]
+    seed = np.random.SeedSequence(5)
+    first = compare_rules(8, 4, rules, 40, chunk_size=10, seed=seed, estimate_budget=4)
+    second = compare_rules(8, 4, rules, 40, chunk_size=10, seed=seed, estimate_budget=4)
+    from_int = compare_rules(8, 4, rules, 40, chunk_size=10, seed=5, estimate_budget=4)
+    for a, b, c in zip(first, second, from_int):
+        assert np.array_equal(a, b) and np.array_equal(a, c)
+
+
+def test_compare_rules_estimates_only_skip_unjustifiable_rankings():
+    rules = [AV(), SeqPAV()]
+    avg, success = compare_rules(8, 5, rules, iterations=30, chunk_size=7, seed=4)
+    avg_estimate, success_estimate = compare_rules(8, 5, rules, iterations=30, chunk_size=7,
+                                                   seed=4, estimate_budget=4)
+    assert np.array_equal(success, success_estimate)
+    assert np.all(avg_estimate >= avg - 1e-12)
+
+
+def test_compare_rules_records(tmp_path):
+    rules = [AV(), SeqPAV()]
+    with ResultSink(str(tmp_path), buffer_size=8) as sink:
+        avg, success = compare_rules(6, 4, rules, iterations=10, chunk_size=4, seed=0, sink=sink)
+    records = load_records(str(tmp_path))
+    assert len(records['rule']) == 20
+    assert list(records['rule'][:2]) == [rule.name for rule in rules]
+    assert np.all(records['profile'][::2] == records['profile'][1::2])
+    assert records['ranking'].shape == (20, 4)
+    assert np.allclose(records['quality'].reshape(10, 2).mean(axis=0), avg[:2])
+    assert np.allclose(records['justifiable'].reshape(10, 2).mean(axis=0), success[:2])
+
+    # a new run appends new chunks
+    compare_rules(6, 4, rules, iterations=3, seed=1, sink=str(tmp_path))
+    assert len(load_records(str(tmp_path))['rule']) == 26
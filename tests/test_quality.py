@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""Tests for `proportional_ranking.utils.quality`."""
+
+import numpy as np
+import pytest
+
+from proportional_ranking.utils.quality import (justify, quality, quality_brute_force,
+                                                quality_estimate, PrefixSatisfaction)
+from proportional_ranking.constants import hard_profile_1
+from proportional_ranking.utils.profiles import WeightedProfile
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_quality_matches_brute_force(seed):
+    rng = np.random.RandomState(seed)
+    for _ in range(10):
+        n, m = rng.randint(1, 8), rng.randint(1, 6)
+        profile = rng.rand(n, m) > rng.rand()
+        ranking = rng.permutation(m)
+        assert quality(profile, ranking) == quality_brute_force(profile, ranking)
+
+
+def test_quality_hard_profile():
+    rng = np.random.RandomState(42)
+    for _ in range(5):
+        ranking = rng.permutation(5)
+        assert quality(hard_profile_1, ranking) == quality_brute_force(hard_profile_1, ranking)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 4096])
+def test_justify_matches_brute_force_quality(batch_size):
+    rng = np.random.RandomState(batch_size)
+    for _ in range(100):
+        n, m = rng.randint(1, 8), rng.randint(1, 6)
+        profile = rng.rand(n, m) > rng.rand()
+        ranking = rng.permutation(m)
+        expected = quality_brute_force(profile, ranking) >= 1
+        assert justify(profile, ranking, batch_size=batch_size) == expected
+
+
+def test_prefix_satisfaction_shared():
+    rng = np.random.RandomState(0)
+    for _ in range(50):
+        n, m = rng.randint(1, 8), rng.randint(1, 6)
+        profile = rng.rand(n, m) > rng.rand()
+        ranking = rng.permutation(m)
+        prefix = PrefixSatisfaction(profile, ranking)
+        expected = justify(profile, ranking)
+        assert justify(profile, ranking, prefix=prefix) == expected
+        assert quality(profile, ranking, prefix=prefix) == quality_brute_force(profile, ranking)
+        assert justify(profile, ranking, prefix=prefix) == expected
+
+
+def test_weighted_profile_quality():
+    rng = np.random.RandomState(1)
+    for _ in range(50):
+        t, m = rng.randint(1, 4), rng.randint(1, 6)
+        ballots = rng.rand(t, m) > rng.rand()
+        counts = rng.randint(1, 4, size=t)
+        profile = np.repeat(ballots, counts, axis=0)
+        ranking = rng.permutation(m)
+        expected = quality_brute_force(profile, ranking)
+        weighted = WeightedProfile(ballots, counts)
+        assert quality(weighted, ranking) == expected
+        assert justify(weighted, ranking, batch_size=3) == (expected >= 1)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_quality_estimate_is_witnessed_upper_bound(seed):
+    rng = np.random.RandomState(seed)
+    for _ in range(20):
+        n, m = rng.randint(1, 10), rng.randint(1, 6)
+        profile = rng.rand(n, m) > rng.rand()
+        ranking = rng.permutation(m)
+        expected = quality_brute_force(profile, ranking)
+        estimate, witness = quality_estimate(profile, ranking, budget=8, seed=seed)
+        assert estimate >= expected
+        if estimate < 1:
+            assert not justify(profile, ranking)
+        if witness is None:
+            assert estimate == np.inf
+            continue
+        clique, k, size = witness
+        members = profile[:, clique].all(axis=1)
+        satisfaction = np.sort(profile[members][:, ranking[:k]].sum(axis=1))
+        assert estimate == satisfaction[:size].sum() / size / (size * k // n)
+        assert quality_estimate(profile, ranking, budget=64, seed=seed)[0] == expected
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+"""Tests for `proportional_ranking.rules`."""
+
+from fractions import Fraction
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from proportional_ranking.rules import (JustifiedRanking, MaximizeQuality, RankingNotFoundError,
+                                        ScorePAV, BordaPAV, SeqScorePAV, seqX, AV, SeqPAV, SeqRAV,
+                                        GeometricPAV, ReverseSeqPAV, ReverseSeqRAV, Phragmen,
+                                        sumLoads, enestrom)
+from proportional_ranking.constants import hard_profile_1
+from proportional_ranking.utils.profiles import WeightedProfile
+from proportional_ranking.utils.quality import justify, quality
+
+
+def random_profiles(seed, count, max_voters=7, max_candidates=5):
+    rng = np.random.RandomState(seed)
+    for _ in range(count):
+        n, m = rng.randint(1, max_voters + 1), rng.randint(1, max_candidates + 1)
+        yield rng.rand(n, m) > rng.rand()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_maximize_quality_matches_exhaustive_search(seed):
+    for profile in random_profiles(seed, 20):
+        _, m = profile.shape
+        max_q, expected = 0, None
+        for ranking in permutations(range(m)):
+            q = quality(profile, ranking)
+            if q > max_q:
+                max_q, expected = q, ranking
+        assert MaximizeQuality().set_profile(profile).ranking() == expected
+
+
+def test_maximize_quality_with_candidates_without_supporters():
+    # SeqPAV ranks candidate 0 again once the others have a score of 0
+    profile = [[1, 0, 0, 0], [0, 0, 0, 0]]
+    assert MaximizeQuality().set_profile(profile).ranking() == (0, 1, 2, 3)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_justified_ranking_matches_exhaustive_search(seed):
+    for profile in random_profiles(seed, 20):
+        _, m = profile.shape
+        expected = next((r for r in permutations(range(m)) if justify(profile, r)), None)
+        rule = JustifiedRanking().set_profile(profile)
+        if expected is None:
+            with pytest.raises(RankingNotFoundError):
+                rule.ranking()
+        else:
+            assert rule.ranking() == expected
+
+
+def test_justified_ranking_not_found():
+    profile = [[0, 0, 1, 0], [0, 0, 0, 1], [1, 0, 0, 0], [1, 0, 1, 0], [0, 1, 0, 0], [0, 1, 0, 1]]
+    with pytest.raises(RankingNotFoundError):
+        JustifiedRanking().set_profile(profile).ranking()
+
+
+@pytest.mark.parametrize("rule", [ScorePAV(), BordaPAV(), ScorePAV([1, 1, 1, 1, 1]),
+                                  ScorePAV([2, 1, 1, 0, 0])])
+def test_score_pav_matches_brute_force(rule):
+    for profile in random_profiles(0, 30):
+        rule.set_profile(profile)
+        _, m = profile.shape
+        vector = rule._get_scoring_vector(m)
+        expected = rule._brute_force_ranking()
+        ranking = rule.ranking()
+        if expected is None:
+            assert ranking is None
+        else:
+            assert rule._get_score(profile, ranking, vector) == pytest.approx(
+                rule._get_score(profile, expected, vector))
+
+
+@pytest.mark.parametrize("scorevec", ['b', 1, [3, 2, 2, 1, 1]])
+def test_seq_score_pav_matches_exact_gains(scorevec):
+    for profile in random_profiles(1, 30, max_voters=12):
+        n, m = profile.shape
+        if scorevec == 'b':
+            vector = list(range(m - 1, -1, -1))
+        elif scorevec == 1:
+            vector = [1] * m
+        else:
+            vector = scorevec
+        expected = []
+        for t in range(m):
+            approved = [sum(int(profile[v, c]) for c in expected) for v in range(n)]
+            gains = [sum(Fraction(vector[t], 1 + approved[v]) for v in range(n) if profile[v, c])
+                     if c not in expected else -1 for c in range(m)]
+            expected.append(gains.index(max(gains)))
+        assert SeqScorePAV(scorevec).set_profile(profile).ranking() == expected
+
+
+@pytest.mark.parametrize("increment", [0, 0.05, 0.3])
+def test_seqx_float_backend_matches_fraction_backend(increment):
+    profiles = [hard_profile_1] + [p for p in random_profiles(2, 60, max_voters=20, max_candidates=6)
+                                   if p.sum(axis=0).min() > 0]
+    for profile in profiles:
+        exact = seqX(increment).set_profile(profile).ranking()
+        assert seqX(increment, backend='float').set_profile(profile).ranking() == exact
+
+
+@pytest.mark.parametrize("rule", [AV(), SeqPAV(), SeqRAV([1, 1/2, 1/4, 1/8, 1/16, 1/32]),
+                                  GeometricPAV(2), ReverseSeqPAV(0.5),
+                                  ReverseSeqRAV([1, 1/2, 1/4, 1/8, 1/16, 1/32]), Phragmen(),
+                                  sumLoads(), enestrom(), seqX()])
+def test_sparse_profile_matches_dense_profile(rule):
+    sparse = pytest.importorskip("scipy.sparse")
+    for profile in random_profiles(3, 40, max_voters=15):
+        if profile.sum(axis=0).min() == 0:
+            continue
+        dense = [int(c) for c in rule.set_profile(profile).ranking()]
+        rule.set_profile(sparse.csr_matrix(profile))
+        assert sparse.issparse(rule.profile)
+        assert [int(c) for c in rule.ranking()] == dense
+        assert rule.quality == quality(profile, dense)
+
+
+@pytest.mark.parametrize("rule", [AV(), SeqPAV(), SeqRAV([1, 1/2, 1/4, 1/8, 1/16, 1/32]),
+                                  ReverseSeqRAV([1, 1/2, 1/4, 1/8, 1/16, 1/32]), Phragmen(),
+                                  sumLoads(), enestrom(), seqX(), seqX(0.05, backend='float'),
+                                  ScorePAV(), SeqScorePAV(), MaximizeQuality()])
+def test_weighted_profile_matches_expanded_profile(rule):
+    rng = np.random.RandomState(4)
+    for ballots in random_profiles(4, 30, max_voters=4):
+        if ballots.sum(axis=0).min() == 0:
+            continue
+        profile = np.repeat(ballots, rng.randint(1, 5, size=len(ballots)), axis=0)
+        expected = rule.set_profile(profile).ranking()
+        if expected is None:
+            assert rule.set_profile(WeightedProfile(profile)).ranking() is None
+            continue
+        expected_quality = rule.quality
+        rule.set_profile(WeightedProfile(profile))
+        assert [int(c) for c in rule.ranking()] == [int(c) for c in expected]
+        assert rule.quality == expected_quality
+
+
+@pytest.mark.parametrize("rule", [SeqPAV(), SeqRAV([1, 1/2, 1/4, 1/8]), GeometricPAV(3),
+                                  ReverseSeqPAV(0.5), ReverseSeqRAV([1, 1/2, 1/4, 1/8]),
+                                  sumLoads()])
+def test_rank_batch_matches_ranking(rule):
+    rng = np.random.RandomState(5)
+    for n, m in [(1, 1), (5, 4), (12, 7)]:
+        profiles = rng.rand(50, n, m) > rng.rand(50, 1, 1)
+        rankings = rule.rank_batch(profiles)
+        assert rankings.shape == (50, m)
+        for profile, ranking in zip(profiles, rankings):
+            assert list(ranking) == [int(c) for c in rule.set_profile(profile).ranking()]
+
+
+@pytest.mark.parametrize("rule", [SeqPAV(), SeqRAV([1, 1/2, 1/4, 1/8, 1/16, 1/32]),
+                                  SeqRAV([1, 1/2]), GeometricPAV(2), Phragmen(), sumLoads()])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_voter_updates_match_new_profile(rule, weighted):
+    rng = np.random.RandomState(6)
+    for profile in random_profiles(6, 30, max_voters=10, max_candidates=6):
+        rule.set_profile(WeightedProfile(profile) if weighted else profile).ranking()
+        _, m = profile.shape
+        for _ in range(4):
+            if rng.rand() < 0.5 or rule.profile.shape[0] < 2:
+                rule.add_voters(rng.rand(rng.randint(1, 3), m) > 0.5)
+            else:
+                rule.remove_voters([rng.randint(rule.profile.shape[0])])
+            updated = [int(c) for c in rule.ranking()]
+            assert updated == [int(c) for c in rule.set_profile(rule.profile).ranking()]
+
+
+def test_seqpav_matches_exact_arithmetic():
+    for profile in random_profiles(7, 200, max_voters=12, max_candidates=6):
+        if profile.sum(axis=0).min() == 0:
+            continue
+        n, m = profile.shape
+        weights = [0] * n
+        remaining = list(range(m))
+        expected = []
+        for _ in range(m):
+            scores = [sum(Fraction(1, weights[i] + 1) for i in range(n) if profile[i, c])
+                      for c in remaining]
+            best = remaining[scores.index(max(scores))]
+            expected.append(best)
+            remaining.remove(best)
+            weights = [w + bool(profile[i, best]) for i, w in enumerate(weights)]
+        assert [int(c) for c in SeqPAV().set_profile(profile).ranking()] == expected
+
+
+def test_reverse_seqpav_matches_exact_arithmetic():
+    for profile in random_profiles(8, 200, max_voters=12, max_candidates=6):
+        n, m = profile.shape
+        weights = list(profile.sum(axis=1))
+        remaining = list(range(m))
+        expected = []
+        for _ in range(m):
+            scores = [sum(Fraction(1, weights[i]) for i in range(n) if profile[i, c])
+                      for c in remaining]
+            # among the candidates with the lowest score, the last one is removed
+            worst = [c for c, s in zip(remaining, scores) if s == min(scores)][-1]
+            expected.insert(0, worst)
+            remaining.remove(worst)
+            weights = [w - bool(profile[i, worst]) for i, w in enumerate(weights)]
+        assert [int(c) for c in ReverseSeqPAV().set_profile(profile).ranking()] == expected
+
+
+def phragmen_scan(profile):
+    # the candidate by candidate scan of the first implementation of Phragmen
+    n, m = profile.shape
+    scores = profile.copy()
+    load = np.zeros(n)
+    ranking = []
+    for _ in range(m):
+        j = -1
+        min_v = np.inf
+        for k in range(m):
+            av_score = scores[:, k].sum()
+            if av_score == 0:
+                if min_v == np.inf and k not in ranking:
+                    j = k
+            else:
+                s = (1 + load.dot(scores[:, k])) / av_score
+                if min_v - s > 0.0001:
+                    j = k
+                    min_v = s
+        ranking.append(j)
+        load[scores[:, j]] = min_v
+        scores[:, j] = False
+    return ranking
+
+
+@pytest.mark.parametrize("max_voters", [6, 300])
+def test_phragmen_matches_candidate_scan(max_voters):
+    # small profiles have exact ties, and large ones have loads closer than the tolerance
+    for profile in random_profiles(9, 100, max_voters=max_voters, max_candidates=6):
+        assert [int(c) for c in Phragmen().set_profile(profile).ranking()] == phragmen_scan(profile)
+
+
+def enestrom_scan(profile):
+    # the voter by voter loads of the first implementation of enestrom
+    n, m = profile.shape
+    scores = profile.copy()
+    loads = [[] for _ in range(n)]
+    ranking = []
+    for i in range(1, m + 1):
+        quota = n / (i + 1)
+        load_i = np.ones(n)
+        for k in range(n):
+            for total_score_i in loads[k]:
+                if quota > total_score_i:
+                    load_i[k] = 0
+                else:
+                    load_i[k] *= (1 - quota / total_score_i)
+        scores_vec = np.maximum(0, load_i).dot(scores)
+        j = -1
+        max_v = -1
+        for k in range(m):
+            if scores_vec[k] - max_v > 0.0001:
+                j = k
+                max_v = scores_vec[k]
+        ranking.append(j)
+        av_score = np.sum(scores[:, j])
+        for k in range(n):
+            if scores[k, j]:
+                loads[k].append(av_score)
+        scores[:, j] = False
+    return ranking
+
+
+@pytest.mark.parametrize("max_voters", [6, 300])
+def test_enestrom_matches_voter_scan(max_voters):
+    for profile in random_profiles(10, 100, max_voters=max_voters, max_candidates=6):
+        assert [int(c) for c in enestrom().set_profile(profile).ranking()] == enestrom_scan(profile)